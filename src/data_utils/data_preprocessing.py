@@ -1,15 +1,22 @@
+import time
 import pandas as pd
 import warnings
+import multiprocessing as mp
+from pathlib import Path
+from typing import Union
 
 from src.data_utils.file_reader import FileReader
 from src.utils.constants import Paths
-from src.utils.preprocessing_helpers import (convert_html_to_ascii,
+from src.utils.metrics import Metrics, get_current_rss_bytes, get_peak_rss_bytes
+from src.utils.preprocessing_helpers import (apply_cleaning,
+                                             convert_html_to_ascii,
                                              remove_html_tags,
                                              split_uppercase_after_lowercase,
                                              convert_to_lowercase,
                                              remove_whitespaces,
                                              remove_repeated_punctuations,
-                                             contains_only_punctuations_regex)
+                                             replace_only_punctuations,
+                                             remove_numbers)
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -31,7 +38,8 @@ def clean_job_advertisements(
         title_remove_whitespaces: bool = True,
         title_remove_repeated_punctuations: bool = True,
         title_remove_only_punctuations: bool = True,
-        title_remove_numbers: bool = True,) -> pd.DataFrame:
+        title_remove_numbers: bool = True,
+        dtype_backend: str = "numpy_nullable") -> pd.DataFrame:
     """
     Cleans the job advertisements DataFrame by applying a series of text cleaning operations.
 
@@ -53,6 +61,8 @@ def clean_job_advertisements(
         title_remove_repeated_punctuations (bool): Whether to remove repeated punctuations from the title.
         title_remove_only_punctuations (bool): Convert the title to '-' if it contains only punctuations.
         title_remove_numbers (bool): Remove misleading numbers from job title.
+        dtype_backend (str): "numpy_nullable" or "pyarrow". With "pyarrow" the text columns stay Arrow-backed
+            and the cleaning steps run as vectorized pyarrow.compute kernels.
 
     Returns:
         pd.DataFrame: Cleaned DataFrame with the specified operations applied.
@@ -61,7 +71,7 @@ def clean_job_advertisements(
     print("Starting cleaning job advertisements...")
 
     # Convert data types
-    df = df.convert_dtypes()
+    df = df.convert_dtypes(dtype_backend=dtype_backend)
 
     # Count and report missing values
     id_na_count = df.id.isna().sum()
@@ -92,36 +102,43 @@ def clean_job_advertisements(
     if desc_convert_html_to_ascii:
         # Convert html to ascii in description
         print("Converting HTML entities to ASCII in description...")
-        df['description_clean'] = df['description'].apply(convert_html_to_ascii)
+        with Metrics.timer("clean_job_advertisements.description.convert_html_to_ascii", rows=len(df)):
+            df['description_clean'] = apply_cleaning(df['description'], convert_html_to_ascii)
     if desc_remove_html_tags:
         # Remove html tags from descriptions
         print("Removing HTML tags from description...")
-        df['description_clean'] = df['description_clean'].apply(remove_html_tags)
+        with Metrics.timer("clean_job_advertisements.description.remove_html_tags", rows=len(df)):
+            df['description_clean'] = apply_cleaning(df['description_clean'], remove_html_tags)
     if desc_split_uppercase:
         # Split uppercase characters after lowercase characters in description
         print("Splitting uppercase characters after lowercase in description...")
-        df['description_clean'] = df['description_clean'].apply(split_uppercase_after_lowercase)
+        with Metrics.timer("clean_job_advertisements.description.split_uppercase", rows=len(df)):
+            df['description_clean'] = apply_cleaning(df['description_clean'], split_uppercase_after_lowercase)
     if desc_convert_to_lowercase:
         # Convert description to lowercase
         print("Converting description to lowercase...")
-        df['description_clean'] = df['description_clean'].apply(convert_to_lowercase)
+        with Metrics.timer("clean_job_advertisements.description.convert_to_lowercase", rows=len(df)):
+            df['description_clean'] = apply_cleaning(df['description_clean'], convert_to_lowercase)
     if desc_remove_whitespaces:
         # Remove extra whitespaces from description
         print("Removing extra whitespaces from description...")
-        df['description_clean'] = df['description_clean'].apply(remove_whitespaces)
+        with Metrics.timer("clean_job_advertisements.description.remove_whitespaces", rows=len(df)):
+            df['description_clean'] = apply_cleaning(df['description_clean'], remove_whitespaces)
     if desc_remove_repeated_punctuations:
         # Remove repeated punctuations from description
         print("Removing repeated punctuations from description...")
-        df['description_clean'] = df['description_clean'].apply(remove_repeated_punctuations)
+        with Metrics.timer("clean_job_advertisements.description.remove_repeated_punctuations", rows=len(df)):
+            df['description_clean'] = apply_cleaning(df['description_clean'], remove_repeated_punctuations)
     if desc_remove_only_punctuations:
         # Convert description to empty string when it contains only punctuations
         print("Converting description to empty string when it contains only punctuations...")
-        df['description_clean'] = df['description_clean'].apply(
-            lambda x: "-" if contains_only_punctuations_regex(x) else x)
+        with Metrics.timer("clean_job_advertisements.description.remove_only_punctuations", rows=len(df)):
+            df['description_clean'] = apply_cleaning(df['description_clean'], replace_only_punctuations)
     if desc_remove_numbers:
         # Removing misleading numbers from job description
         print("Removing misleading numbers from job description...")
-        df['description_clean_nn'] = df['description_clean'].str.replace(r'\d+', '', regex=True)
+        with Metrics.timer("clean_job_advertisements.description.remove_numbers", rows=len(df)):
+            df['description_clean_nn'] = apply_cleaning(df['description_clean'], remove_numbers)
 
     # Clean title column
     print("Cleaning title column...")
@@ -132,43 +149,110 @@ def clean_job_advertisements(
     if title_convert_html_to_ascii:
         # Convert html to ascii in title
         print("Converting HTML entities to ASCII in title...")
-        df['title_clean'] = df['title'].apply(convert_html_to_ascii)
+        with Metrics.timer("clean_job_advertisements.title.convert_html_to_ascii", rows=len(df)):
+            df['title_clean'] = apply_cleaning(df['title'], convert_html_to_ascii)
     if title_remove_html_tags:
         # Remove html tags from title
         print("Removing HTML tags from title...")
-        df['title_clean'] = df['title_clean'].apply(remove_html_tags)
+        with Metrics.timer("clean_job_advertisements.title.remove_html_tags", rows=len(df)):
+            df['title_clean'] = apply_cleaning(df['title_clean'], remove_html_tags)
     if title_split_uppercase:
         # Split uppercase characters after lowercase characters in title
         print("Splitting uppercase characters after lowercase in title...")
-        df['title_clean'] = df['title_clean'].apply(split_uppercase_after_lowercase)
+        with Metrics.timer("clean_job_advertisements.title.split_uppercase", rows=len(df)):
+            df['title_clean'] = apply_cleaning(df['title_clean'], split_uppercase_after_lowercase)
     if title_convert_to_lowercase:
         # Convert title to lowercase
         print("Converting title to lowercase...")
-        df['title_clean'] = df['title_clean'].apply(convert_to_lowercase)
+        with Metrics.timer("clean_job_advertisements.title.convert_to_lowercase", rows=len(df)):
+            df['title_clean'] = apply_cleaning(df['title_clean'], convert_to_lowercase)
     if title_remove_whitespaces:
         # Remove extra whitespaces from title
         print("Removing extra whitespaces from title...")
-        df['title_clean'] = df['title_clean'].apply(remove_whitespaces)
+        with Metrics.timer("clean_job_advertisements.title.remove_whitespaces", rows=len(df)):
+            df['title_clean'] = apply_cleaning(df['title_clean'], remove_whitespaces)
     if title_remove_repeated_punctuations:
         # Remove repeated punctuations from title
         print("Removing repeated punctuations from title...")
-        df['title_clean'] = df['title_clean'].apply(remove_repeated_punctuations)
+        with Metrics.timer("clean_job_advertisements.title.remove_repeated_punctuations", rows=len(df)):
+            df['title_clean'] = apply_cleaning(df['title_clean'], remove_repeated_punctuations)
     if title_remove_only_punctuations:
         # Convert title to empty string when it contains only punctuations
         print("Converting title to empty string when it contains only punctuations...")
-        df['title_clean'] = df['title_clean'].apply(
-            lambda x: "-" if contains_only_punctuations_regex(x) else x)
+        with Metrics.timer("clean_job_advertisements.title.remove_only_punctuations", rows=len(df)):
+            df['title_clean'] = apply_cleaning(df['title_clean'], replace_only_punctuations)
     if title_remove_numbers:
         # Removing misleading numbers from job titles
         print("Removing misleading numbers from job titles...")
-        df['title_clean_nn'] = df['title_clean'].str.replace(r'\d+', '', regex=True)
+        with Metrics.timer("clean_job_advertisements.title.remove_numbers", rows=len(df)):
+            df['title_clean_nn'] = apply_cleaning(df['title_clean'], remove_numbers)
 
 
     print("Completed cleaning job advertisements.")
 
     # Convert data types
-    df = df.convert_dtypes()
+    df = df.convert_dtypes(dtype_backend=dtype_backend)
     print("Final data types:")
     print(df.dtypes)
 
     return df
+
+
+def _run_cleaning_backend(path: Union[str, Path], dtype_backend: str) -> dict:
+    """
+    Reads and cleans the job advertisements with one backend, measuring time and peak memory.
+
+    Runs in a fresh process, as the peak RSS of a process never decreases.
+    """
+    rss_before = get_current_rss_bytes()
+    start = time.perf_counter()
+    df = FileReader.read_job_advertisements(dtype_backend=dtype_backend, path=path)
+    read_seconds = time.perf_counter() - start
+    read_peak = get_peak_rss_bytes()
+
+    start = time.perf_counter()
+    df = clean_job_advertisements(df, dtype_backend=dtype_backend)
+    clean_seconds = time.perf_counter() - start
+
+    return {
+        "dtype_backend": dtype_backend,
+        "read_seconds": read_seconds,
+        "clean_seconds": clean_seconds,
+        "read_peak_mb": (read_peak - rss_before) / 2**20,
+        "peak_mb": (get_peak_rss_bytes() - rss_before) / 2**20,
+        "output_mb": df.memory_usage(deep=True).sum() / 2**20,
+        "output": df,
+    }
+
+
+def benchmark_cleaning_backends(path: Union[str, Path] = Paths.INPUT_DATA_PATH) -> pd.DataFrame:
+    """
+    Compares reading and cleaning the job advertisements with the two dtype backends.
+
+    Each backend reads the same CSV through FileReader and cleans it with clean_job_advertisements
+    in its own process, so that the peak RSS increase over the process baseline measures the
+    working memory of that backend alone.
+
+    Args:
+        path (Union[str, Path]): The raw job advertisements CSV, e.g. a sample of Paths.INPUT_DATA_PATH.
+
+    Returns:
+        pd.DataFrame: One row per backend with the read and cleaning times, the peak memory increase
+        after reading and after cleaning, the memory of the cleaned DataFrame and the number of
+        cleaned values that differ from the "numpy_nullable" output.
+    """
+    results = []
+    # Spawn rather than fork so that each backend starts from a clean process
+    context = mp.get_context("spawn")
+    for dtype_backend in ["numpy_nullable", "pyarrow"]:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(_run_cleaning_backend, (path, dtype_backend)))
+
+    outputs = {result["dtype_backend"]: result.pop("output") for result in results}
+    clean_columns = ['description_clean', 'description_clean_nn', 'title_clean', 'title_clean_nn']
+    for result in results:
+        result["differences"] = sum(
+            int((outputs[result["dtype_backend"]][col].astype(object) != outputs["numpy_nullable"][col].astype(object)).sum())
+            for col in clean_columns)
+
+    return pd.DataFrame(results)
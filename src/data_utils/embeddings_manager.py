@@ -1,37 +1,70 @@
 import numpy as np
 import pickle
 from tqdm import tqdm
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 from FlagEmbedding import BGEM3FlagModel
 
 from src.utils.constants import Paths
+from src.utils.metrics import Metrics
+from src.data_utils.embeddings_quantization import quantize_embeddings
+from src.data_utils.long_text import encode_long_texts, prepare_segments
 
-def embed_and_save(model: BGEM3FlagModel, col: List[str], file_name: str, batch_size: int) -> None:
+def embed_and_save(model: BGEM3FlagModel, col: List[str], file_name: str, batch_size: int, count_tokens: bool = False,
+                   quantization: Optional[str] = None, mode: str = "full", max_tokens: int = 512,
+                   pooling: str = "mean", head_tokens: Optional[int] = None, stride: Optional[int] = None) -> None:
     """
     Generate embeddings for the given text data and save them to a file.
 
     Parameters:
-    - model (BGEM3FlagModel): The desired BGEM3FlagModel model
+    - model (BGEM3FlagModel): The desired BGEM3FlagModel model, or any Encoder from src.data_utils.encoders
     - col (List[str]): A list of strings to generate embeddings for.
     - file_name (str): The name of the file to save the embeddings to.
     - batch_size (int): The batch size for the inference
+    - count_tokens (bool): Whether to tokenize the column once more to report the number of encoded tokens in "full"
+      mode. Other modes always report it, from the segments they encode.
+    - quantization (Optional[str]): Store "int8" or "binary" quantized codes instead of float32 embeddings
+    - mode (str): Long text handling, one of "full", "truncate", "head_tail" or "chunk" (see src.data_utils.long_text)
+    - max_tokens (int): Token budget per text or chunk when mode is not "full"
+    - pooling (str): Pooling of chunk embeddings in "chunk" mode, "mean" or "weighted"
+    - head_tokens (Optional[int]): Tokens kept from the start in "head_tail" mode, defaults to half of max_tokens
+    - stride (Optional[int]): Step between chunk starts in "chunk" mode, defaults to max_tokens (no overlap)
 
     Returns:
     - None
     """
+    stage = f"embed_and_save.{Path(file_name).stem}"
     try:
         
+        # Count the tokens the encoder will see
+        segments = None
+        if mode != "full":
+            segments = prepare_segments(model.tokenizer, col, mode, max_tokens, head_tokens, stride)
+            Metrics.count("tokens", int(segments.n_tokens.sum()), stage=stage)
+        elif count_tokens:
+            input_ids = model.tokenizer(col, truncation=True, max_length=8192)['input_ids']
+            Metrics.count("tokens", sum(len(ids) for ids in input_ids), stage=stage)
+
         # Encode the text data
-        embeddings = model.encode(col, 
-        batch_size=batch_size,
-        max_length=8192)['dense_vecs']
+        with Metrics.timer(stage, rows=len(col), batch_size=batch_size, mode=mode, max_tokens=max_tokens):
+            embeddings = encode_long_texts(model, col,
+            batch_size=batch_size,
+            mode=mode,
+            max_tokens=max_tokens,
+            pooling=pooling,
+            head_tokens=head_tokens,
+            stride=stride,
+            segments=segments)
         
         # Replace '-' with zero vectors
         for i, string in enumerate(col):
             if string == '-':
                 embeddings[i] = np.zeros(embeddings.shape[1])
         
+        # Quantize embeddings to compact codes
+        if quantization is not None:
+            embeddings = quantize_embeddings(embeddings, quantization)
+
         # Save embeddings to a file
         with open(Path(Paths.EMBEDDINGS_DATA_PATH) / file_name, 'wb') as file:
             pickle.dump(embeddings, file)
@@ -39,6 +72,8 @@ def embed_and_save(model: BGEM3FlagModel, col: List[str], file_name: str, batch_
         print(f"Embeddings saved successfully to {file_name}")
 
     except Exception as e:
+        Metrics.count("errors", stage=stage)
+        Metrics.log("error", stage=stage, error=repr(e))
         print(f"An error occurred: {e}")
 
 def compute_cosine_similarity_matrix(A: np.ndarray, B: np.ndarray) -> np.ndarray:
@@ -62,13 +97,14 @@ def compute_cosine_similarity_matrix(A: np.ndarray, B: np.ndarray) -> np.ndarray
     magnitude_B = np.linalg.norm(B, axis=1)
     
     # Compute cosine similarity for each pair of vectors
-    pbar = tqdm(range(n))
-    for i in pbar:
-        for j in range(d):
-            # Compute dot product
-            dot_product = np.dot(A[i], B[j])
-            # Compute cosine similarity
-            similarity_matrix[i, j] = dot_product / (magnitude_A[i] * magnitude_B[j])
+    with Metrics.timer("compute_cosine_similarity_matrix", rows=n):
+        pbar = tqdm(range(n))
+        for i in pbar:
+            for j in range(d):
+                # Compute dot product
+                dot_product = np.dot(A[i], B[j])
+                # Compute cosine similarity
+                similarity_matrix[i, j] = dot_product / (magnitude_A[i] * magnitude_B[j])
     
     return similarity_matrix
 
@@ -90,12 +126,13 @@ def get_knn(similarity_matrix: np.ndarray, k: int) -> np.ndarray:
     knn_indices = np.zeros((n, k), dtype=int)
     
     # Iterate over each row
-    pbar =  tqdm(range(n))
-    for i in pbar:
-        # Get the indices that would sort the row in descending order
-        sorted_indices = np.argsort(-similarity_matrix[i])
-        
-        # Select the top k indices
-        knn_indices[i] = sorted_indices[:k]
+    with Metrics.timer("get_knn", rows=n):
+        pbar =  tqdm(range(n))
+        for i in pbar:
+            # Get the indices that would sort the row in descending order
+            sorted_indices = np.argsort(-similarity_matrix[i])
+            
+            # Select the top k indices
+            knn_indices[i] = sorted_indices[:k]
     
     return knn_indices
\ No newline at end of file
@@ -0,0 +1,316 @@
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple, Union
+
+QUANTIZATION_METHODS = ("int8", "binary")
+
+
+@dataclass
+class QuantizedEmbeddings:
+    """
+    Compact representation of an embedding matrix.
+
+    Attributes:
+        method (str): Either "int8" (symmetric scalar quantization per dimension) or "binary" (sign bits).
+        codes (np.ndarray): int8 codes of shape (n, dim) or packed sign bits of shape (n, ceil(dim / 8)).
+        dim (int): Dimensionality of the original embeddings.
+        scale (Optional[np.ndarray]): Per-dimension float32 scale of the int8 codes, None for binary.
+        zero_rows (Optional[np.ndarray]): Boolean mask of rows that were all-zero vectors (e.g. '-' texts),
+            which sign bits cannot represent.
+    """
+    method: str
+    codes: np.ndarray
+    dim: int
+    scale: Optional[np.ndarray] = None
+    zero_rows: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.codes, self.scale, self.zero_rows) if array is not None)
+
+    def dequantize(self, rows: slice = slice(None)) -> np.ndarray:
+        """
+        Reconstructs a float32 approximation of the embeddings.
+
+        For binary codes the approximation is the {-1, +1} sign vector. Rows marked in `zero_rows`
+        are reconstructed as zero vectors.
+
+        Args:
+            rows (slice): Rows to reconstruct.
+
+        Returns:
+            np.ndarray: float32 array of shape (n_rows, dim).
+        """
+        codes = self.codes[rows]
+        if self.method == "int8":
+            embeddings = codes.astype(np.float32) * self.scale
+        else:
+            embeddings = np.unpackbits(codes, axis=1, count=self.dim).astype(np.float32) * 2 - 1
+        if self.zero_rows is not None:
+            embeddings[self.zero_rows[rows]] = 0
+        return embeddings
+
+
+def quantize_embeddings(embeddings: np.ndarray, method: str, scale: Optional[np.ndarray] = None) -> QuantizedEmbeddings:
+    """
+    Quantizes a float embedding matrix.
+
+    Args:
+        embeddings (np.ndarray): Embeddings of shape (n, dim).
+        method (str): "int8" or "binary".
+        scale (Optional[np.ndarray]): Per-dimension int8 scale to reuse. Calibrated from the data when None.
+
+    Returns:
+        QuantizedEmbeddings: The quantized embeddings.
+    """
+    if method not in QUANTIZATION_METHODS:
+        raise ValueError(f"Unknown quantization method '{method}', expected one of {QUANTIZATION_METHODS}")
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    dim = embeddings.shape[1]
+    zero_rows = ~embeddings.any(axis=1)
+
+    if method == "binary":
+        return QuantizedEmbeddings(method=method, codes=np.packbits(embeddings > 0, axis=1), dim=dim, zero_rows=zero_rows)
+
+    if scale is None:
+        # Symmetric per-dimension range; all-zero dimensions (e.g. '-' rows only) keep a unit scale
+        scale = np.abs(embeddings).max(axis=0) / 127
+        scale[scale == 0] = 1
+    scale = scale.astype(np.float32)
+    codes = np.clip(np.rint(embeddings / scale), -127, 127).astype(np.int8)
+    return QuantizedEmbeddings(method=method, codes=codes, dim=dim, scale=scale, zero_rows=zero_rows)
+
+
+def combine_quantized(parts: Sequence[Tuple[QuantizedEmbeddings, float]], batch_size: int = 8192) -> QuantizedEmbeddings:
+    """
+    Computes the weighted sum of several int8 embedding matrices without materialising them in float32.
+
+    This is the int8 counterpart of e.g. `title * W_JOBS_TITLE + description * W_JOBS_DESCRIPTION`.
+    Zero rows of a part contribute nothing, so a job with a '-' description keeps its title signal.
+
+    Binary codes are refused: the sign of a weighted sum of sign vectors is the sign vector of the
+    heaviest part, so the other parts would be lost. Pass the parts to knn_quantized instead, which
+    fuses them at score time.
+
+    Args:
+        parts (Sequence[Tuple[QuantizedEmbeddings, float]]): int8 matrices of the same shape with their weights.
+        batch_size (int): Number of rows reconstructed at a time.
+
+    Returns:
+        QuantizedEmbeddings: The quantized weighted sum.
+    """
+    method = parts[0][0].method
+    n, dim = len(parts[0][0]), parts[0][0].dim
+    if method != "int8":
+        raise ValueError("combine_quantized only supports int8 codes; pass binary parts with their weights to knn_quantized")
+    if any(part.method != method or len(part) != n for part, _ in parts):
+        raise ValueError("All parts must share the same quantization method and number of rows")
+
+    # |sum(w * x)| <= sum(|w| * max|x|), so this scale never clips
+    scale = sum(abs(w) * part.scale for part, w in parts)
+
+    codes, zero_rows = [], []
+    for start in range(0, n, batch_size):
+        rows = slice(start, start + batch_size)
+        combined = quantize_embeddings(sum(w * part.dequantize(rows) for part, w in parts), method, scale=scale)
+        codes.append(combined.codes)
+        zero_rows.append(combined.zero_rows)
+    return QuantizedEmbeddings(method=method, codes=np.concatenate(codes), dim=dim, scale=scale,
+                               zero_rows=np.concatenate(zero_rows))
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return x / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # Unordered top-k per row, then sort only those k columns
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def knn_float32(A: np.ndarray, B: np.ndarray, k: int, batch_size: int = 1024) -> np.ndarray:
+    """
+    Exact cosine k nearest neighbours on full-precision embeddings, computed in batches.
+
+    Args:
+        A (np.ndarray): Query embeddings of size (n, dim).
+        B (np.ndarray): Label embeddings of size (d, dim).
+        k (int): The number of neighbours to return, at most the number of labels.
+        batch_size (int): Number of query rows scored at a time.
+
+    Returns:
+        np.ndarray: An array of size (n, k) with label indices ordered by decreasing similarity.
+    """
+    B = _normalize(np.asarray(B, dtype=np.float32))
+    k = min(k, B.shape[0])
+    knn_indices = np.zeros((A.shape[0], k), dtype=int)
+    for start in range(0, A.shape[0], batch_size):
+        batch = _normalize(np.asarray(A[start:start + batch_size], dtype=np.float32))
+        knn_indices[start:start + batch_size] = _top_k(batch @ B.T, k)
+    return knn_indices
+
+
+def _compact_labels(jobs: QuantizedEmbeddings, labels: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Labels in the same compact space as the jobs, with the factor that brings compact dot products
+    to a common scale across parts.
+
+    For int8 the job scale is folded into the labels before quantizing them with a single scale, so
+    that the integer dot product is proportional to the true one. Codes are cast to float32 so the
+    product runs through BLAS.
+    """
+    if jobs.method == "binary":
+        return np.where(labels > 0, 1, -1).astype(np.float32), 1 / jobs.dim
+    folded = labels * jobs.scale
+    label_scale = np.abs(folded).max() / 127 or 1
+    codes = quantize_embeddings(folded, "int8", scale=np.full(jobs.dim, label_scale, dtype=np.float32)).codes
+    return codes.astype(np.float32), label_scale
+
+
+def _compact_jobs(jobs: QuantizedEmbeddings, rows: slice) -> np.ndarray:
+    if jobs.method == "binary":
+        return jobs.dequantize(rows)
+    job_codes = jobs.codes[rows].astype(np.float32)
+    if jobs.zero_rows is not None:
+        job_codes[jobs.zero_rows[rows]] = 0
+    return job_codes
+
+
+def knn_quantized(
+        jobs: Union[QuantizedEmbeddings, Sequence[Tuple[QuantizedEmbeddings, float]]],
+        labels: np.ndarray,
+        k: int,
+        rescore_multiplier: int = 4,
+        batch_size: int = 512) -> np.ndarray:
+    """
+    Retrieves the k most similar labels for each job from quantized job embeddings.
+
+    Candidates are selected on the compact codes: Hamming distance for binary codes (computed as
+    dim - 2 * Hamming, the dot product of the sign vectors) and int8 x int8 dot products for int8
+    codes. The `k * rescore_multiplier` candidates are then rescored with the reconstructed job
+    vector against the full-precision, normalised label vectors. Rows marked in `zero_rows` score
+    0 against every label, as zero vectors do in knn_float32.
+
+    Several weighted parts, e.g. [(title, W_JOBS_TITLE), (description, W_JOBS_DESCRIPTION)], are
+    fused at score time: the candidate score is the weighted sum of the per-part scores and the
+    rescoring vector the weighted sum of the normalised reconstructions. For unit-norm embeddings
+    this ranks labels like the float32 weighted sum, and it is the only way to combine binary parts.
+
+    Args:
+        jobs (Union[QuantizedEmbeddings, Sequence[Tuple[QuantizedEmbeddings, float]]]): Quantized job
+            embeddings of n rows, or several such matrices of the same shape with their weights.
+        labels (np.ndarray): Full-precision label embeddings of size (d, dim).
+        k (int): The number of neighbours to return, at most the number of labels.
+        rescore_multiplier (int): Candidate set size as a multiple of k. 1 disables rescoring.
+        batch_size (int): Number of job rows scored at a time.
+
+    Returns:
+        np.ndarray: An array of size (n, k) with label indices ordered by decreasing rescored similarity.
+    """
+    parts = [(jobs, 1.0)] if isinstance(jobs, QuantizedEmbeddings) else list(jobs)
+    n = len(parts[0][0])
+    if any(len(part) != n for part, _ in parts):
+        raise ValueError("All parts must have the same number of rows")
+
+    labels = _normalize(np.asarray(labels, dtype=np.float32))
+    k = min(k, labels.shape[0])
+    n_candidates = min(k * rescore_multiplier, labels.shape[0])
+    compact_labels = [_compact_labels(part, labels) for part, _ in parts]
+
+    knn_indices = np.zeros((n, k), dtype=int)
+    for start in range(0, n, batch_size):
+        rows = slice(start, start + batch_size)
+        scores = sum(w * factor * (_compact_jobs(part, rows) @ label_codes.T)
+                     for (part, w), (label_codes, factor) in zip(parts, compact_labels))
+        candidates = _top_k(scores, n_candidates)
+
+        if n_candidates == k:
+            knn_indices[rows] = candidates
+            continue
+
+        # Exact rescoring of the candidates against full-precision labels
+        approx = sum(w * _normalize(part.dequantize(rows)) for part, w in parts)
+        scores = np.einsum("bd,bcd->bc", approx, labels[candidates])
+        knn_indices[rows] = np.take_along_axis(candidates, _top_k(scores, k), axis=1)
+    return knn_indices
+
+
+def recall_at_k(predicted: np.ndarray, reference: np.ndarray) -> float:
+    """
+    Fraction of the reference neighbours that are present in the predicted neighbours, averaged over rows.
+
+    Args:
+        predicted (np.ndarray): Predicted neighbour indices of size (n, k).
+        reference (np.ndarray): Reference neighbour indices of size (n, k).
+
+    Returns:
+        float: The recall@k.
+    """
+    hits = (predicted[:, :, None] == reference[:, None, :]).any(axis=1)
+    return float(hits.mean())
+
+
+def benchmark_quantized_knn(
+        jobs: np.ndarray,
+        labels: np.ndarray,
+        k: int = 5,
+        rescore_multipliers: Tuple[int, ...] = (1, 4),
+        job_parts: Optional[Sequence[Tuple[np.ndarray, float]]] = None) -> pd.DataFrame:
+    """
+    Compares memory, retrieval time and recall@k of the quantized paths with the float32 path.
+
+    Recall is measured against the exact float32 k nearest neighbours.
+
+    Args:
+        jobs (np.ndarray): Full-precision job embeddings of size (n, dim).
+        labels (np.ndarray): Full-precision label embeddings of size (d, dim).
+        k (int): The number of neighbours to retrieve.
+        rescore_multipliers (Tuple[int, ...]): Candidate multipliers to benchmark for each quantization method.
+        job_parts (Optional[Sequence[Tuple[np.ndarray, float]]]): Weighted full-precision parts, e.g.
+            [(title, W_JOBS_TITLE), (description, W_JOBS_DESCRIPTION)], to also benchmark the combined
+            retrieval path: the float32 weighted sum against the quantized parts fused in knn_quantized.
+
+    Returns:
+        pd.DataFrame: One row per input and configuration with storage size, retrieval time and recall@k.
+    """
+    inputs = [("jobs", [(np.asarray(jobs, dtype=np.float32), 1.0)])]
+    if job_parts is not None:
+        inputs.append(("weighted_parts", [(np.asarray(part, dtype=np.float32), w) for part, w in job_parts]))
+
+    results = []
+    for name, parts in inputs:
+        start = time.perf_counter()
+        reference = knn_float32(sum(w * part for part, w in parts), labels, k)
+        results.append({
+            "input": name,
+            "method": "float32",
+            "rescore_multiplier": None,
+            "storage_mb": sum(part.nbytes for part, _ in parts) / 2**20,
+            "seconds": time.perf_counter() - start,
+            f"recall@{k}": 1.0,
+        })
+
+        for method in QUANTIZATION_METHODS:
+            quantized = [(quantize_embeddings(part, method), w) for part, w in parts]
+            for multiplier in rescore_multipliers:
+                start = time.perf_counter()
+                predicted = knn_quantized(quantized, labels, k, rescore_multiplier=multiplier)
+                results.append({
+                    "input": name,
+                    "method": method,
+                    "rescore_multiplier": multiplier,
+                    "storage_mb": sum(part.nbytes for part, _ in quantized) / 2**20,
+                    "seconds": time.perf_counter() - start,
+                    f"recall@{k}": recall_at_k(predicted, reference),
+                })
+
+    return pd.DataFrame(results)
@@ -0,0 +1,300 @@
+import os
+import time
+import string
+import random
+import argparse
+import tempfile
+import numpy as np
+import torch
+import onnxruntime as ort
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from tqdm import tqdm
+from transformers import AutoModel, AutoTokenizer, BertConfig, BertModel, BertTokenizerFast
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from src.utils.constants import Paths
+
+
+class Encoder(ABC):
+    """
+    Dense text encoder with the same `encode(...)['dense_vecs']` interface as BGEM3FlagModel.
+
+    Subclasses implement `_encode_batch`. Texts are sorted by length before batching so that
+    each batch carries as little padding as possible, and the CLS embedding is L2-normalised
+    as in BGE-M3 dense retrieval.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    @abstractmethod
+    def _encode_batch(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Returns the last hidden state of shape (batch, seq_len, hidden) for a tokenized batch.
+        """
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 12, max_length: int = 8192) -> Dict[str, np.ndarray]:
+        """
+        Encodes sentences into normalised dense vectors.
+
+        Args:
+            sentences (Union[str, List[str]]): The text(s) to encode.
+            batch_size (int): The batch size for the inference.
+            max_length (int): Maximum number of tokens per text.
+
+        Returns:
+            Dict[str, np.ndarray]: {'dense_vecs': array of shape (n, hidden)}, or (hidden,) for a single string.
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        lengths = [len(ids) for ids in self.tokenizer(sentences, truncation=True, max_length=max_length)['input_ids']]
+        order = np.argsort(lengths)[::-1]
+
+        dense_vecs = [None] * len(sentences)
+        for start in tqdm(range(0, len(sentences), batch_size), desc="Inference Embeddings", disable=len(sentences) < 256):
+            indices = order[start:start + batch_size]
+            inputs = self.tokenizer([sentences[i] for i in indices],
+                                    padding=True,
+                                    truncation=True,
+                                    max_length=max_length,
+                                    return_tensors='np')
+            cls = self._encode_batch(dict(inputs))[:, 0]
+            cls = cls / np.linalg.norm(cls, axis=-1, keepdims=True)
+            for i, vec in zip(indices, cls):
+                dense_vecs[i] = vec
+
+        dense_vecs = np.stack(dense_vecs).astype(np.float32)
+        return {'dense_vecs': dense_vecs[0] if single else dense_vecs}
+
+
+class TorchEncoder(Encoder):
+    """
+    Eager PyTorch encoder for a local Hugging Face model, used as the reference for other backends.
+    """
+
+    def __init__(self,
+                 model_path: Union[str, Path],
+                 num_threads: Optional[int] = None,
+                 use_fp16: bool = False,
+                 device: str = 'cpu'):
+        """
+        Args:
+            model_path (Union[str, Path]): Local directory of the Hugging Face model.
+            num_threads (Optional[int]): Intra-op threads of torch. Defaults to the torch default.
+            use_fp16 (bool): Whether to run in half precision, only applied on CUDA devices.
+            device (str): Torch device. Defaults to 'cpu' so that comparisons with OnnxEncoder run on the same hardware.
+        """
+        super().__init__(AutoTokenizer.from_pretrained(model_path, local_files_only=True))
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.device = device
+        self.model = AutoModel.from_pretrained(model_path, local_files_only=True).to(self.device).eval()
+        if use_fp16 and self.device.startswith('cuda'):
+            self.model = self.model.half()
+
+    @torch.inference_mode()
+    def _encode_batch(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        inputs = {name: torch.from_numpy(value).to(self.device) for name, value in inputs.items()}
+        return self.model(**inputs).last_hidden_state.float().cpu().numpy()
+
+
+class OnnxEncoder(Encoder):
+    """
+    ONNX Runtime CPU encoder, optionally running a dynamically int8-quantized graph.
+    """
+
+    def __init__(self,
+                 onnx_path: Union[str, Path],
+                 tokenizer_path: Union[str, Path],
+                 intra_op_num_threads: Optional[int] = None):
+        """
+        Args:
+            onnx_path (Union[str, Path]): Path to the exported (and optionally quantized) ONNX model.
+            tokenizer_path (Union[str, Path]): Local directory containing the tokenizer.
+            intra_op_num_threads (Optional[int]): Threads used inside each operator. Defaults to OMP_NUM_THREADS
+                when set (e.g. by the sharded embedding workers), otherwise to the number of CPUs.
+        """
+        super().__init__(AutoTokenizer.from_pretrained(tokenizer_path, local_files_only=True))
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # ONNX Runtime ignores OMP_NUM_THREADS, so the limit is applied explicitly
+        options.intra_op_num_threads = intra_op_num_threads or int(os.environ.get("OMP_NUM_THREADS") or os.cpu_count())
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=['CPUExecutionProvider'])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def _encode_batch(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+        return self.session.run(['last_hidden_state'], feed)[0]
+
+    @classmethod
+    def export(cls,
+               model_path: Union[str, Path],
+               output_dir: Optional[Union[str, Path]] = None,
+               quantize: bool = True) -> Path:
+        """
+        Exports a local Hugging Face encoder to ONNX and applies dynamic int8 weight quantization.
+
+        Models larger than 2 GB, such as BAAI/bge-m3, are written with external data files.
+
+        Args:
+            model_path (Union[str, Path]): Local directory of the Hugging Face model.
+            output_dir (Optional[Union[str, Path]]): Directory to write the ONNX files to.
+                Defaults to `<MODELS_DATA_PATH>/<model directory name>-onnx`.
+            quantize (bool): Whether to also write a dynamically int8-quantized model.
+
+        Returns:
+            Path: Path to the quantized model if `quantize` is True, otherwise to the fp32 model.
+        """
+        output_dir = Path(output_dir or Path(Paths.MODELS_DATA_PATH, f"{Path(model_path).name}-onnx"))
+        output_dir.mkdir(parents=True, exist_ok=True)
+        fp32_path = output_dir / 'model.onnx'
+        int8_path = output_dir / 'model_int8.onnx'
+
+        print("Exporting model to ONNX:", fp32_path)
+        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        model = AutoModel.from_pretrained(model_path, local_files_only=True).eval()
+        dummy = tokenizer(["an example job advertisement"], return_tensors='pt')
+        with torch.inference_mode():
+            torch.onnx.export(model,
+                              (dummy['input_ids'], dummy['attention_mask']),
+                              str(fp32_path),
+                              input_names=['input_ids', 'attention_mask'],
+                              output_names=['last_hidden_state'],
+                              dynamic_axes={'input_ids': {0: 'batch', 1: 'sequence'},
+                                            'attention_mask': {0: 'batch', 1: 'sequence'},
+                                            'last_hidden_state': {0: 'batch', 1: 'sequence'}},
+                              opset_version=17)
+        tokenizer.save_pretrained(output_dir)
+
+        if not quantize:
+            return fp32_path
+
+        print("Quantizing ONNX model to int8:", int8_path)
+        quantize_dynamic(str(fp32_path),
+                         str(int8_path),
+                         weight_type=QuantType.QInt8,
+                         use_external_data_format=True)
+        return int8_path
+
+
+def compare_encoders(reference: Encoder,
+                     candidate: Encoder,
+                     sentences: List[str],
+                     batch_size: int = 12,
+                     max_length: int = 512) -> Dict[str, float]:
+    """
+    Checks that a candidate encoder agrees with a reference encoder and compares their throughput.
+
+    Args:
+        reference (Encoder): The reference encoder, typically a TorchEncoder.
+        candidate (Encoder): The encoder to validate, typically an OnnxEncoder.
+        sentences (List[str]): Sample texts to encode.
+        batch_size (int): The batch size for the inference.
+        max_length (int): Maximum number of tokens per text.
+
+    Returns:
+        Dict[str, float]: Mean and minimum cosine agreement, throughput of both encoders and the speedup.
+    """
+    # Warm-up so one-off initialisation is not timed
+    reference.encode(sentences[:batch_size], batch_size=batch_size, max_length=max_length)
+    candidate.encode(sentences[:batch_size], batch_size=batch_size, max_length=max_length)
+
+    start = time.perf_counter()
+    reference_vecs = reference.encode(sentences, batch_size=batch_size, max_length=max_length)['dense_vecs']
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate_vecs = candidate.encode(sentences, batch_size=batch_size, max_length=max_length)['dense_vecs']
+    candidate_seconds = time.perf_counter() - start
+
+    # Both outputs are L2-normalised, so the row-wise dot product is the cosine similarity
+    cosine = np.sum(reference_vecs * candidate_vecs, axis=1)
+    results = {
+        'mean_cosine': float(cosine.mean()),
+        'min_cosine': float(cosine.min()),
+        'reference_sentences_per_second': len(sentences) / reference_seconds,
+        'candidate_sentences_per_second': len(sentences) / candidate_seconds,
+        'speedup': reference_seconds / candidate_seconds,
+    }
+    print("Encoder comparison:", results)
+    return results
+
+
+def create_test_model(output_dir: Union[str, Path], hidden_size: int = 768, num_layers: int = 6) -> Path:
+    """
+    Writes a small randomly initialised BERT encoder with a character-level tokenizer.
+
+    The weights are meaningless, but the graph has the same operators as BGE-M3, which is enough to
+    check ONNX export, quantization parity and relative throughput offline.
+
+    Args:
+        output_dir (Union[str, Path]): Directory to write the model and tokenizer to.
+        hidden_size (int): Hidden size of the encoder.
+        num_layers (int): Number of transformer layers.
+
+    Returns:
+        Path: The model directory.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    vocab = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + list(string.ascii_lowercase + string.digits + string.punctuation)
+    with open(output_dir / 'vocab.txt', 'w') as file:
+        file.write("\n".join(vocab) + "\n")
+    BertTokenizerFast(str(output_dir / 'vocab.txt')).save_pretrained(output_dir)
+    config = BertConfig(vocab_size=len(vocab),
+                        hidden_size=hidden_size,
+                        num_hidden_layers=num_layers,
+                        num_attention_heads=hidden_size // 64,
+                        intermediate_size=hidden_size * 4,
+                        max_position_embeddings=512)
+    BertModel(config).save_pretrained(output_dir)
+    return output_dir
+
+
+def check_onnx_encoder(model_path: Optional[Union[str, Path]] = None,
+                       n_sentences: int = 256,
+                       batch_size: int = 16,
+                       max_length: int = 128,
+                       num_threads: Optional[int] = None) -> Dict[str, float]:
+    """
+    Exports a model to int8 ONNX in a temporary directory and compares it with the PyTorch reference on CPU.
+
+    Args:
+        model_path (Optional[Union[str, Path]]): Local directory of the Hugging Face model. Defaults to a
+            model from create_test_model.
+        n_sentences (int): Number of random sentences to encode.
+        batch_size (int): The batch size for the inference.
+        max_length (int): Maximum number of tokens per text.
+        num_threads (Optional[int]): Threads of both encoders. Defaults to the number of CPUs.
+
+    Returns:
+        Dict[str, float]: The output of compare_encoders.
+    """
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(500)]
+    sentences = [" ".join(rng.choices(words, k=rng.randint(5, 60))) for _ in range(n_sentences)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = model_path or create_test_model(Path(tmp_dir) / 'model')
+        onnx_path = OnnxEncoder.export(model_path, Path(tmp_dir) / 'onnx')
+        reference = TorchEncoder(model_path, num_threads=num_threads or os.cpu_count(), device='cpu')
+        candidate = OnnxEncoder(onnx_path, Path(tmp_dir) / 'onnx', intra_op_num_threads=num_threads)
+        return compare_encoders(reference, candidate, sentences, batch_size=batch_size, max_length=max_length)
+
+
+if __name__ == "__main__":
+    # Offline parity and throughput check: python -m src.data_utils.encoders [--model-path PATH]
+    parser = argparse.ArgumentParser(description="Compare the int8 ONNX Runtime encoder with the PyTorch reference on CPU.")
+    parser.add_argument("--model-path", default=None, help="Local Hugging Face model. Defaults to a small random BERT.")
+    parser.add_argument("--n-sentences", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--num-threads", type=int, default=None)
+    args = parser.parse_args()
+    check_onnx_encoder(args.model_path, args.n_sentences, args.batch_size, args.max_length, args.num_threads)
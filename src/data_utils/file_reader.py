@@ -1,42 +1,52 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
 from src.utils.constants import Paths
 
 
 class FileReader:
 
     @classmethod
-    def read_job_advertisements(cls) -> pd.DataFrame:
-        print("Reading raw job advertisements from:", Paths.INPUT_DATA_PATH)
-        df = pd.read_csv(Paths.INPUT_DATA_PATH,
-                         engine='python',
-                         encoding='utf-8')
-        df = df.convert_dtypes()
+    def _read_csv(cls, path, dtype_backend: str, string_columns: tuple = ()) -> pd.DataFrame:
+        if dtype_backend == "pyarrow":
+            # Read straight into Arrow-backed columns; descriptions may contain quoted newlines
+            table = pv.read_csv(path,
+                                parse_options=pv.ParseOptions(newlines_in_values=True),
+                                convert_options=pv.ConvertOptions(
+                                    column_types={col: pa.string() for col in string_columns},
+                                    strings_can_be_null=True))
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        return pd.read_csv(path,
+                           engine='python',
+                           encoding='utf-8',
+                           dtype={col: str for col in string_columns})
+
+    @classmethod
+    def read_job_advertisements(cls, dtype_backend: str = "numpy_nullable", path=Paths.INPUT_DATA_PATH) -> pd.DataFrame:
+        print("Reading raw job advertisements from:", path)
+        df = cls._read_csv(path, dtype_backend)
+        df = df.convert_dtypes(dtype_backend=dtype_backend)
         print("Raw job advertisements read successfully. Shape:", df.shape)
         return df
 
     @classmethod
-    def read_clean_job_advertisements(cls) -> pd.DataFrame:
+    def read_clean_job_advertisements(cls, dtype_backend: str = "numpy_nullable") -> pd.DataFrame:
         print("Reading clean job advertisements from:", Paths.CLEAN_DATA_PATH)
-        df = pd.read_csv(Paths.CLEAN_DATA_PATH,
-                         engine='python',
-                         encoding='utf-8')
-        df = df.convert_dtypes()
+        df = cls._read_csv(Paths.CLEAN_DATA_PATH, dtype_backend)
+        df = df.convert_dtypes(dtype_backend=dtype_backend)
         print("Clean job advertisements read successfully. Shape:", df.shape)
         return df
 
     @classmethod
-    def read_isco_labels(cls) -> pd.DataFrame:
+    def read_isco_labels(cls, dtype_backend: str = "numpy_nullable") -> pd.DataFrame:
         print("Reading raw ISCO taxonomy from:", Paths.INPUT_LABELS_PATH)
-        df = pd.read_csv(Paths.INPUT_LABELS_PATH,
-                         engine='python',
-                         encoding='utf-8',
-                         dtype={'code': str})
-        df = df.drop('isco_uri', axis=1).rename(columns={'label': 'title'}).convert_dtypes()
+        df = cls._read_csv(Paths.INPUT_LABELS_PATH, dtype_backend, string_columns=['code'])
+        df = df.drop('isco_uri', axis=1).rename(columns={'label': 'title'}).convert_dtypes(dtype_backend=dtype_backend)
         print("Raw eurostat taxonomy read successfully. Shape:", df.shape)
         return df
     
     @classmethod
-    def read_external_labels(cls) -> pd.DataFrame:
+    def read_external_labels(cls, dtype_backend: str = "numpy_nullable") -> pd.DataFrame:
         print("Reading reference taxonomy from:", Paths.INPUT_TAXONOMY_PATH)
         df = (pd.read_excel(Paths.INPUT_TAXONOMY_PATH,
                             dtype={'ISCO 08 Code': str})
@@ -49,13 +59,15 @@ class FileReader:
                                'Definition': 'description_ext',
                                'Level': 'level'})
               )
+        if dtype_backend == "pyarrow":
+            df = df.convert_dtypes(dtype_backend=dtype_backend)
         print("Reference taxonomy read and processed successfully. Shape:", df.shape)
         return df
 
     @classmethod
-    def read_combined_labels(cls) -> pd.DataFrame:
-        reference = cls.read_external_labels()
-        eurostat = cls.read_isco_labels()
+    def read_combined_labels(cls, dtype_backend: str = "numpy_nullable") -> pd.DataFrame:
+        reference = cls.read_external_labels(dtype_backend)
+        eurostat = cls.read_isco_labels(dtype_backend)
         print("Merging reference taxonomy and eurostat taxonomy...")
         df = reference.merge(eurostat,
                              on="code",
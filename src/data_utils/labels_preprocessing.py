@@ -3,13 +3,15 @@ import warnings
 
 from src.data_utils.file_reader import FileReader
 from src.utils.constants import Paths
-from src.utils.preprocessing_helpers import (convert_html_to_ascii,
+from src.utils.metrics import Metrics
+from src.utils.preprocessing_helpers import (apply_cleaning,
+                                             convert_html_to_ascii,
                                              remove_html_tags,
                                              split_uppercase_after_lowercase,
                                              convert_to_lowercase,
                                              remove_whitespaces,
                                              remove_repeated_punctuations,
-                                             contains_only_punctuations_regex,
+                                             replace_only_punctuations,
                                              extract_included_occupations,
                                              extract_excluded_numbers)
 
@@ -76,7 +78,8 @@ def clean_isco_labels(
     all_convert_to_lowercase: bool = True,
     all_remove_whitespaces: bool = True,
     all_remove_repeated_punctuations: bool = True,
-    all_remove_only_punctuations: bool = True
+    all_remove_only_punctuations: bool = True,
+    dtype_backend: str = "numpy_nullable"
 ) -> pd.DataFrame:
     """
     Cleans the specified columns in the DataFrame by applying a series of text cleaning operations.
@@ -90,6 +93,8 @@ def clean_isco_labels(
         all_remove_whitespaces (bool): Remove extra whitespaces.
         all_remove_repeated_punctuations (bool): Remove repeated punctuations.
         all_remove_only_punctuations (bool): Convert to '-' if it contains only punctuations.
+        dtype_backend (str): "numpy_nullable" or "pyarrow". With "pyarrow" the text columns stay Arrow-backed
+            and the cleaning steps run as vectorized pyarrow.compute kernels.
     
     Returns:
         pd.DataFrame: Cleaned DataFrame with the specified operations applied.
@@ -97,7 +102,7 @@ def clean_isco_labels(
     print("Starting cleaning isco labels...")
 
     # Convert data types
-    df = df.convert_dtypes()
+    df = df.convert_dtypes(dtype_backend=dtype_backend)
 
     # Count and report missing values
     for col in df.columns:
@@ -113,11 +118,13 @@ def clean_isco_labels(
 
     # Extract included occupations to a new column
     print("Extracting included occupations...")
-    df['included_occupations_map'] = df['description'].apply(extract_included_occupations)
+    with Metrics.timer("clean_isco_labels.extract_included_occupations", rows=len(df)):
+        df['included_occupations_map'] = df['description'].apply(extract_included_occupations)
 
     # Extract excluded occupations to a new column
     print("Extracting excluded occupations...")
-    df['excluded_occupations_map'] = df['description'].apply(extract_excluded_numbers)
+    with Metrics.timer("clean_isco_labels.extract_excluded_numbers", rows=len(df)):
+        df['excluded_occupations_map'] = df['description'].apply(extract_excluded_numbers)
 
     # Apply cleaning operations to all columns
     for col in ['title_ext_level_4', 'description_ext_level_4',
@@ -136,40 +143,45 @@ def clean_isco_labels(
         
         if all_convert_html_to_ascii:
             print(f"Converting HTML entities to ASCII in {col}...")
-            df[f'{col}_clean'] = df[f'{col}_clean'].apply(convert_html_to_ascii)
+            with Metrics.timer("clean_isco_labels.convert_html_to_ascii", rows=len(df)):
+                df[f'{col}_clean'] = apply_cleaning(df[f'{col}_clean'], convert_html_to_ascii)
         
         if all_remove_html_tags:
             print(f"Removing HTML tags from {col}...")
-            df[f'{col}_clean'] = df[f'{col}_clean'].apply(remove_html_tags)
+            with Metrics.timer("clean_isco_labels.remove_html_tags", rows=len(df)):
+                df[f'{col}_clean'] = apply_cleaning(df[f'{col}_clean'], remove_html_tags)
         
         if all_split_uppercase:
             print(f"Splitting uppercase characters after lowercase in {col}...")
-            df[f'{col}_clean'] = df[f'{col}_clean'].apply(split_uppercase_after_lowercase)
+            with Metrics.timer("clean_isco_labels.split_uppercase", rows=len(df)):
+                df[f'{col}_clean'] = apply_cleaning(df[f'{col}_clean'], split_uppercase_after_lowercase)
         
         if all_convert_to_lowercase:
             print(f"Converting {col} to lowercase...")
-            df[f'{col}_clean'] = df[f'{col}_clean'].apply(convert_to_lowercase)
+            with Metrics.timer("clean_isco_labels.convert_to_lowercase", rows=len(df)):
+                df[f'{col}_clean'] = apply_cleaning(df[f'{col}_clean'], convert_to_lowercase)
         
         if all_remove_whitespaces:
             print(f"Removing extra whitespaces from {col}...")
-            df[f'{col}_clean'] = df[f'{col}_clean'].apply(remove_whitespaces)
+            with Metrics.timer("clean_isco_labels.remove_whitespaces", rows=len(df)):
+                df[f'{col}_clean'] = apply_cleaning(df[f'{col}_clean'], remove_whitespaces)
         
         if all_remove_repeated_punctuations:
             print(f"Removing repeated punctuations from {col}...")
-            df[f'{col}_clean'] = df[f'{col}_clean'].apply(remove_repeated_punctuations)
+            with Metrics.timer("clean_isco_labels.remove_repeated_punctuations", rows=len(df)):
+                df[f'{col}_clean'] = apply_cleaning(df[f'{col}_clean'], remove_repeated_punctuations)
         
         if all_remove_only_punctuations:
             print(f"Converting {col} to empty string when it contains only punctuations...")
-            df[f'{col}_clean'] = df[f'{col}_clean'].apply(
-                lambda x: '-' if contains_only_punctuations_regex(x) else x
-            )
+            with Metrics.timer("clean_isco_labels.remove_only_punctuations", rows=len(df)):
+                df[f'{col}_clean'] = apply_cleaning(df[f'{col}_clean'], replace_only_punctuations)
 
     # Creating unique id column
     print("Creating unique id column...")
     df["id"] = (df.index + 1).astype("int64")
 
     # Convert data types
-    df = df.convert_dtypes()
+    df = df.convert_dtypes(dtype_backend=dtype_backend)
     print("Final data types:")
     print(df.dtypes)
 
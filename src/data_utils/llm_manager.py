@@ -4,6 +4,28 @@ from tqdm import tqdm
 import ollama
 
 
+def format_label_choices(clean_labels: pd.DataFrame) -> List[str]:
+    """
+    Format the context block describing each label in the prompts.
+    
+    Parameters:
+    clean_labels (pd.DataFrame): DataFrame containing label information
+    
+    Returns:
+    List[str]: One context block per row of clean_labels.
+    """
+    return [
+        (
+            f"ID: {row['code']}\n"
+            f"TITLE: {row['title_ext_level_4_clean']}\n"
+            f"DESCRIPTION: {row['description_ext_level_4_clean']}\n"
+            f"TASKS INCLUDE: {row['tasks_include_level_4_clean']}\n"
+            f"INCLUDED OCCUPATIONS: {row['included_occupations_level_4_clean']}"
+        )
+        for _, row in clean_labels.iterrows()
+    ]
+
+
 def generate_prompts(
     clean_jobs: pd.DataFrame,
     clean_labels: pd.DataFrame,
@@ -25,6 +47,10 @@ def generate_prompts(
     Dict[int, Tuple[str, str]]: Dictionary mapping job IDs to tuples containing SYSTEM and USER prompts.
     """
     prompts = {}
+
+    # Format the context block of every label once
+    unique_labels = clean_labels.drop_duplicates('code')
+    choices_by_code = dict(zip(unique_labels['code'], format_label_choices(unique_labels)))
     
     # Use tqdm to monitor progress
     for job_id, label_indices in tqdm(dict_reslt.items(), desc="Generating prompts"):
@@ -33,18 +59,7 @@ def generate_prompts(
         job_title = job_row['title_clean'].values[0]
         job_desc = job_row['description_clean'].values[0]
         
-        choices = []
-        for label_id in label_indices:
-            # Using boolean indexing to filter the clean_labels DataFrame
-            label_row = clean_labels[clean_labels['code'] == label_id]
-            choice = (
-                f"ID: {label_row['code'].values[0]}\n"
-                f"TITLE: {label_row['title_ext_level_4_clean'].values[0]}\n"
-                f"DESCRIPTION: {label_row['description_ext_level_4_clean'].values[0]}\n"
-                f"TASKS INCLUDE: {label_row['tasks_include_level_4_clean'].values[0]}\n"
-                f"INCLUDED OCCUPATIONS: {label_row['included_occupations_level_4_clean'].values[0]}"
-            )
-            choices.append(choice)
+        choices = [choices_by_code[label_id] for label_id in label_indices]
         
         choices_str = '\n|||\n'.join(choices)
         all_ids = ', '.join(label_indices)
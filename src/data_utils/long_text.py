@@ -0,0 +1,200 @@
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from src.data_utils.embeddings_quantization import knn_float32, recall_at_k
+
+LONG_TEXT_MODES = ("full", "truncate", "head_tail", "chunk")
+POOLING_METHODS = ("mean", "weighted")
+
+
+class Segments(NamedTuple):
+    """
+    Texts to encode together with the document each one belongs to.
+
+    Attributes:
+        texts (List[str]): The segment texts, across all documents.
+        doc_index (np.ndarray): Index of the source document of each segment.
+        n_tokens (np.ndarray): Number of tokens (without special tokens) of each segment.
+    """
+    texts: List[str]
+    doc_index: np.ndarray
+    n_tokens: np.ndarray
+
+
+def prepare_segments(
+        tokenizer,
+        texts: List[str],
+        mode: str = "truncate",
+        max_tokens: int = 512,
+        head_tokens: Optional[int] = None,
+        stride: Optional[int] = None) -> Segments:
+    """
+    Splits or shortens texts to a token budget.
+
+    Modes:
+        - "full": keep the texts as they are.
+        - "truncate": keep the first `max_tokens` tokens.
+        - "head_tail": keep the first `head_tokens` and the last `max_tokens - head_tokens` tokens,
+          as requirements and contact boilerplate tend to sit at the end of job descriptions.
+        - "chunk": split into windows of `max_tokens` tokens, starting every `stride` tokens.
+
+    Args:
+        tokenizer: The tokenizer of the encoder.
+        texts (List[str]): The texts to prepare.
+        mode (str): One of LONG_TEXT_MODES.
+        max_tokens (int): Token budget per segment, excluding special tokens.
+        head_tokens (Optional[int]): Tokens kept from the start in "head_tail" mode. Defaults to half the budget.
+        stride (Optional[int]): Step between chunk starts in "chunk" mode. Defaults to `max_tokens` (no overlap).
+
+    Returns:
+        Segments: The segments to encode.
+    """
+    if mode not in LONG_TEXT_MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {LONG_TEXT_MODES}")
+
+    input_ids = tokenizer(texts, add_special_tokens=False)['input_ids']
+
+    if mode == "full":
+        return Segments(list(texts), np.arange(len(texts)), np.array([len(ids) for ids in input_ids]))
+
+    head_tokens = max_tokens // 2 if head_tokens is None else head_tokens
+    stride = max_tokens if stride is None else stride
+    if not 0 <= head_tokens <= max_tokens:
+        raise ValueError(f"head_tokens must be between 0 and max_tokens ({max_tokens}), got {head_tokens}")
+    if stride <= 0:
+        raise ValueError(f"stride must be positive, got {stride}")
+
+    segment_ids, doc_index = [], []
+    for i, ids in enumerate(input_ids):
+        if mode == "truncate" or len(ids) <= max_tokens:
+            windows = [ids[:max_tokens]]
+        elif mode == "head_tail":
+            windows = [ids[:head_tokens] + ids[len(ids) - (max_tokens - head_tokens):]]
+        else:
+            windows = [ids[start:start + max_tokens]
+                       for start in range(0, max(len(ids) - max_tokens + stride, 1), stride)]
+        segment_ids.extend(windows)
+        doc_index.extend([i] * len(windows))
+
+    segment_texts = tokenizer.batch_decode(segment_ids, skip_special_tokens=True)
+    # Keep texts that tokenize to nothing (e.g. empty strings) unchanged
+    segment_texts = [text if ids else texts[i] for text, ids, i in zip(segment_texts, segment_ids, doc_index)]
+    return Segments(segment_texts, np.array(doc_index), np.array([len(ids) for ids in segment_ids]))
+
+
+def pool_segments(embeddings: np.ndarray, segments: Segments, n_docs: int, pooling: str = "mean") -> np.ndarray:
+    """
+    Pools segment embeddings into one normalised embedding per document.
+
+    Args:
+        embeddings (np.ndarray): Segment embeddings of size (n_segments, dim).
+        segments (Segments): The segments the embeddings were computed from.
+        n_docs (int): Number of documents.
+        pooling (str): "mean" for an unweighted average, "weighted" to weight chunks by their token count.
+
+    Returns:
+        np.ndarray: Document embeddings of size (n_docs, dim).
+    """
+    if pooling not in POOLING_METHODS:
+        raise ValueError(f"Unknown pooling '{pooling}', expected one of {POOLING_METHODS}")
+    weights = segments.n_tokens.astype(np.float32) if pooling == "weighted" else np.ones(len(segments.texts), np.float32)
+    weights = np.maximum(weights, 1)
+
+    pooled = np.zeros((n_docs, embeddings.shape[1]), dtype=np.float32)
+    np.add.at(pooled, segments.doc_index, embeddings * weights[:, None])
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return pooled / norms
+
+
+def encode_long_texts(
+        model,
+        texts: List[str],
+        batch_size: int,
+        mode: str = "truncate",
+        max_tokens: int = 512,
+        pooling: str = "mean",
+        head_tokens: Optional[int] = None,
+        stride: Optional[int] = None,
+        segments: Optional[Segments] = None) -> np.ndarray:
+    """
+    Encodes texts under a token budget, batching the chunks of all documents together.
+
+    Args:
+        model: A BGEM3FlagModel or an Encoder from src.data_utils.encoders.
+        texts (List[str]): The texts to encode.
+        batch_size (int): The batch size for the inference.
+        mode (str): One of LONG_TEXT_MODES, see prepare_segments.
+        max_tokens (int): Token budget per segment, excluding special tokens.
+        pooling (str): Pooling of chunk embeddings in "chunk" mode, one of POOLING_METHODS.
+        head_tokens (Optional[int]): Tokens kept from the start in "head_tail" mode.
+        stride (Optional[int]): Step between chunk starts in "chunk" mode.
+        segments (Optional[Segments]): Output of prepare_segments for these texts and arguments,
+            to avoid tokenizing them again. Prepared here when None.
+
+    Returns:
+        np.ndarray: Dense embeddings of size (len(texts), dim).
+    """
+    if mode == "full":
+        return model.encode(texts, batch_size=batch_size, max_length=8192)['dense_vecs']
+
+    if segments is None:
+        segments = prepare_segments(model.tokenizer, texts, mode, max_tokens, head_tokens, stride)
+    # Two extra positions for the special tokens added by the encoder
+    embeddings = model.encode(segments.texts, batch_size=batch_size, max_length=max_tokens + 2)['dense_vecs']
+    if mode != "chunk":
+        return embeddings
+    return pool_segments(embeddings, segments, len(texts), pooling)
+
+
+def benchmark_long_text_modes(
+        model,
+        texts: List[str],
+        labels: np.ndarray,
+        configs: Sequence[Dict],
+        batch_size: int = 12,
+        k: int = 5,
+        reference_knn: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Compares encoder throughput and retrieval recall@k of long-text modes.
+
+    Args:
+        model: A BGEM3FlagModel or an Encoder from src.data_utils.encoders.
+        texts (List[str]): A sample of job descriptions.
+        labels (np.ndarray): Label embeddings of size (d, dim) to retrieve from.
+        configs (Sequence[Dict]): Keyword arguments for encode_long_texts, e.g.
+            [{"mode": "truncate", "max_tokens": 256}, {"mode": "chunk", "max_tokens": 256, "pooling": "weighted"}].
+        batch_size (int): The batch size for the inference.
+        k (int): The number of neighbours to retrieve.
+        reference_knn (Optional[np.ndarray]): Reference neighbours of size (len(texts), k), e.g. from gold codes.
+            Defaults to the neighbours retrieved with the "full" mode.
+
+    Returns:
+        pd.DataFrame: One row per configuration with encoded tokens, throughput and recall@k.
+    """
+    if reference_knn is None:
+        full = model.encode(texts, batch_size=batch_size, max_length=8192)['dense_vecs']
+        reference_knn = knn_float32(full, labels, k)
+
+    results = []
+    for config in configs:
+        start = time.perf_counter()
+        segments = prepare_segments(model.tokenizer, texts,
+                                    config.get("mode", "truncate"),
+                                    config.get("max_tokens", 512),
+                                    config.get("head_tokens"),
+                                    config.get("stride"))
+        embeddings = encode_long_texts(model, texts, batch_size=batch_size, segments=segments, **config)
+        seconds = time.perf_counter() - start
+        results.append({
+            **config,
+            "segments": len(segments.texts),
+            "tokens": int(segments.n_tokens.sum()),
+            "docs_per_second": len(texts) / seconds,
+            f"recall@{k}": recall_at_k(knn_float32(embeddings, labels, k), reference_knn),
+        })
+        print("Benchmarked:", results[-1])
+
+    return pd.DataFrame(results)
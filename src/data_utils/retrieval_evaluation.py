@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Sequence, Union
+
+from src.data_utils.llm_manager import format_label_choices
+
+# Number of leading code digits identifying each ISCO level
+ISCO_LEVELS = (1, 2, 3, 4)
+
+
+def count_tokens(texts: List[str], tokenizer=None) -> np.ndarray:
+    """
+    Counts the tokens of each text.
+
+    Args:
+        texts (List[str]): The texts to count.
+        tokenizer: Tokenizer of the LLM. Without one, tokens are estimated as 4 characters each.
+
+    Returns:
+        np.ndarray: Number of tokens per text.
+    """
+    if tokenizer is None:
+        return np.array([len(text) / 4 for text in texts])
+    return np.array([len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']])
+
+
+def estimate_choice_tokens(clean_labels: pd.DataFrame, tokenizer=None) -> np.ndarray:
+    """
+    Estimates the prompt tokens each label adds when it is one of the k candidates.
+
+    This covers the label's context block, the separator between blocks and its ID in the list of classes.
+
+    Args:
+        clean_labels (pd.DataFrame): DataFrame containing label information, in similarity matrix column order.
+        tokenizer: Tokenizer of the LLM. Without one, tokens are estimated as 4 characters each.
+
+    Returns:
+        np.ndarray: Number of tokens per label.
+    """
+    texts = [f"{choice}\n|||\n{code}, " for choice, code in zip(format_label_choices(clean_labels), clean_labels['code'])]
+    return count_tokens(texts, tokenizer)
+
+
+def _ranked_candidates(scores: np.ndarray, max_k: int) -> np.ndarray:
+    # Indices of the max_k highest scores per row, in decreasing order
+    top = np.argpartition(-scores, max_k - 1, axis=1)[:, :max_k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def _normalize_codes(codes: Sequence, name: str) -> np.ndarray:
+    """
+    Converts ISCO codes to four-digit strings, restoring the leading zero that integer codes lose
+    (e.g. 110 from a default pd.read_csv becomes '0110').
+    """
+    codes = pd.Series(np.asarray(codes)).astype(str).str.strip().str.zfill(4)
+    invalid = codes[~codes.str.fullmatch(r'\d{4}')]
+    if not invalid.empty:
+        raise ValueError(f"{name} must be four-digit ISCO codes, got e.g. {invalid.unique()[:5].tolist()}")
+    return codes.to_numpy(dtype=str)
+
+
+def _first_hit_ranks(scores: np.ndarray, label_codes: Sequence[str], gold_codes: Sequence[str]) -> np.ndarray:
+    """
+    0-based rank of the first correct label per job at each ISCO level, of shape (n_levels, n_jobs).
+
+    The rank at a level is the number of labels scoring strictly higher than the best label sharing
+    the gold code prefix, so recall@k at that level is the share of jobs with rank < k. Jobs without
+    any matching label get rank d.
+    """
+    label_codes = _normalize_codes(label_codes, "label_codes")
+    gold_codes = _normalize_codes(gold_codes, "gold_codes")
+    ranks = np.full((len(ISCO_LEVELS), scores.shape[0]), scores.shape[1])
+    for i, level in enumerate(ISCO_LEVELS):
+        matches = gold_codes.astype(f'U{level}')[:, None] == label_codes.astype(f'U{level}')[None, :]
+        best = np.where(matches, scores, -np.inf).max(axis=1)
+        found = matches.any(axis=1)
+        ranks[i, found] = (scores[found] > best[found, None]).sum(axis=1)
+    return ranks
+
+
+def _prompt_tokens(candidates: np.ndarray, choice_tokens: Optional[np.ndarray], base_tokens: Union[float, np.ndarray]) -> Optional[np.ndarray]:
+    # Prompt tokens per job for every k, of shape (n_jobs, max_k)
+    if choice_tokens is None:
+        return None
+    return np.cumsum(np.asarray(choice_tokens)[candidates], axis=1) + np.reshape(base_tokens, (-1, 1))
+
+
+def recall_cost_curve(
+        similarity_matrix: np.ndarray,
+        label_codes: Sequence[str],
+        gold_codes: Sequence[str],
+        sample_rows: Optional[Sequence[int]] = None,
+        choice_tokens: Optional[np.ndarray] = None,
+        base_tokens: Union[float, np.ndarray] = 0.0,
+        max_k: int = 50) -> pd.DataFrame:
+    """
+    Computes recall@k for every k from 1 to max_k at all four ISCO levels, with the expected prompt size.
+
+    A job counts as recalled at level l if one of its top-k labels shares the first l digits of its
+    gold code. All k are evaluated from a single rank computation per level.
+
+    Args:
+        similarity_matrix (np.ndarray): Job-label similarity matrix of size (n, d).
+        label_codes (Sequence[str]): Four-digit code of each similarity matrix column, e.g. clean_labels.code.
+        gold_codes (Sequence[str]): Gold four-digit code of each labelled job.
+        sample_rows (Optional[Sequence[int]]): Similarity matrix rows of the labelled jobs. Defaults to all rows.
+        choice_tokens (Optional[np.ndarray]): Prompt tokens per label, see estimate_choice_tokens.
+        base_tokens (Union[float, np.ndarray]): Prompt tokens independent of k (templates, job title and
+            description), as a scalar or per labelled job.
+        max_k (int): Largest k to evaluate.
+
+    Returns:
+        pd.DataFrame: One row per k with recall_level_1 ... recall_level_4 and, if choice_tokens are
+        given, the mean prompt_tokens.
+    """
+    scores = similarity_matrix if sample_rows is None else similarity_matrix[np.asarray(sample_rows)]
+    max_k = min(max_k, scores.shape[1])
+    ranks = _first_hit_ranks(scores, label_codes, gold_codes)
+
+    curve = pd.DataFrame({"k": np.arange(1, max_k + 1)})
+    for i, level in enumerate(ISCO_LEVELS):
+        # Histogram of first-hit ranks, accumulated into recall@k for every k
+        hits = np.bincount(np.minimum(ranks[i], max_k), minlength=max_k + 1)[:max_k]
+        curve[f"recall_level_{level}"] = np.cumsum(hits) / scores.shape[0]
+
+    tokens = _prompt_tokens(_ranked_candidates(scores, max_k), choice_tokens, base_tokens)
+    if tokens is not None:
+        curve["prompt_tokens"] = tokens.mean(axis=0)
+    return curve
+
+
+def recommend_k(curve: pd.DataFrame, target_recall: float, level: int = 4) -> Optional[int]:
+    """
+    Returns the smallest k whose recall at the given ISCO level meets the target.
+
+    Args:
+        curve (pd.DataFrame): Output of recall_cost_curve.
+        target_recall (float): Required recall, e.g. 0.95.
+        level (int): ISCO level the target applies to.
+
+    Returns:
+        Optional[int]: The recommended k, or None if no evaluated k meets the target.
+    """
+    meeting = curve[curve[f"recall_level_{level}"] >= target_recall]
+    if meeting.empty:
+        print(f"No k up to {curve.k.max()} reaches recall {target_recall} at level {level}.")
+        return None
+    row = meeting.iloc[0]
+    message = f"Smallest k with recall@k >= {target_recall} at level {level}: {int(row.k)}"
+    if "prompt_tokens" in curve:
+        message += f" (~{row.prompt_tokens:.0f} prompt tokens per job)"
+    print(message)
+    return int(row.k)
+
+
+def adaptive_k(similarity_matrix: np.ndarray, margin: float, k_min: int = 1, k_max: int = 50) -> np.ndarray:
+    """
+    Chooses k per job from the drop-off of its similarity scores.
+
+    A job keeps every candidate scoring within `margin` of its best candidate, so confident jobs
+    (one label well ahead of the rest) get short prompts and ambiguous jobs get more candidates.
+
+    Args:
+        similarity_matrix (np.ndarray): Job-label similarity matrix of size (n, d).
+        margin (float): Maximum score difference to the top candidate.
+        k_min (int): Minimum number of candidates.
+        k_max (int): Maximum number of candidates.
+
+    Returns:
+        np.ndarray: k per job.
+    """
+    k_max = min(k_max, similarity_matrix.shape[1])
+    top_scores = np.take_along_axis(similarity_matrix, _ranked_candidates(similarity_matrix, k_max), axis=1)
+    k = (top_scores >= top_scores[:, :1] - margin).sum(axis=1)
+    return np.clip(k, k_min, k_max)
+
+
+def evaluate_adaptive_k(
+        similarity_matrix: np.ndarray,
+        label_codes: Sequence[str],
+        gold_codes: Sequence[str],
+        margins: Sequence[float],
+        sample_rows: Optional[Sequence[int]] = None,
+        choice_tokens: Optional[np.ndarray] = None,
+        base_tokens: Union[float, np.ndarray] = 0.0,
+        k_min: int = 1,
+        k_max: int = 50) -> pd.DataFrame:
+    """
+    Evaluates recall and prompt size of the score drop-off policy of adaptive_k for several margins.
+
+    Args:
+        similarity_matrix (np.ndarray): Job-label similarity matrix of size (n, d).
+        label_codes (Sequence[str]): Four-digit code of each similarity matrix column.
+        gold_codes (Sequence[str]): Gold four-digit code of each labelled job.
+        margins (Sequence[float]): Margins to evaluate.
+        sample_rows (Optional[Sequence[int]]): Similarity matrix rows of the labelled jobs. Defaults to all rows.
+        choice_tokens (Optional[np.ndarray]): Prompt tokens per label, see estimate_choice_tokens.
+        base_tokens (Union[float, np.ndarray]): Prompt tokens independent of k.
+        k_min (int): Minimum number of candidates.
+        k_max (int): Maximum number of candidates.
+
+    Returns:
+        pd.DataFrame: One row per margin with the mean and maximum k, recall at each ISCO level and,
+        if choice_tokens are given, the mean prompt_tokens.
+    """
+    scores = similarity_matrix if sample_rows is None else similarity_matrix[np.asarray(sample_rows)]
+    k_max = min(k_max, scores.shape[1])
+    ranks = _first_hit_ranks(scores, label_codes, gold_codes)
+    tokens = _prompt_tokens(_ranked_candidates(scores, k_max), choice_tokens, base_tokens)
+
+    results = []
+    for margin in margins:
+        k = adaptive_k(scores, margin, k_min, k_max)
+        result = {"margin": margin, "mean_k": k.mean(), "max_k": int(k.max())}
+        for i, level in enumerate(ISCO_LEVELS):
+            result[f"recall_level_{level}"] = (ranks[i] < k).mean()
+        if tokens is not None:
+            result["prompt_tokens"] = tokens[np.arange(len(k)), k - 1].mean()
+        results.append(result)
+
+    return pd.DataFrame(results)
+
+
+def truncate_knn_codes(knn_codes: dict, k_per_job: np.ndarray) -> dict:
+    """
+    Shortens the candidate lists of convert_knn_indices_to_codes to a per-job k.
+
+    Args:
+        knn_codes (dict): Mapping of job IDs to candidate codes, in clean_jobs row order.
+        k_per_job (np.ndarray): k per job, e.g. from adaptive_k, in the same order.
+
+    Returns:
+        dict: Mapping of job IDs to their first k candidate codes, ready for generate_prompts.
+    """
+    return {job_id: codes[:k] for (job_id, codes), k in zip(knn_codes.items(), k_per_job)}
@@ -0,0 +1,257 @@
+import os
+import json
+import hashlib
+import time
+import numpy as np
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from src.utils.constants import Paths
+from src.utils.metrics import Metrics
+from src.data_utils.long_text import encode_long_texts
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+
+
+def _shard_path(job_dir: Path, shard: int) -> Path:
+    return job_dir / f"shard_{shard:05d}.npy"
+
+
+def _marker_path(job_dir: Path, shard: int) -> Path:
+    return job_dir / f"shard_{shard:05d}.done"
+
+
+def _manifest_path(job_dir: Path) -> Path:
+    return job_dir / "manifest.json"
+
+
+def _hash_texts(col: List[str]) -> str:
+    digest = hashlib.sha256()
+    for text in col:
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _check_manifest(job_dir: Path, expected: dict) -> bool:
+    """
+    Compares the given job arguments with the manifest of a previous run.
+
+    Returns:
+        bool: Whether a manifest exists. Raises a ValueError if it does not match.
+    """
+    if not _manifest_path(job_dir).exists():
+        return False
+    with open(_manifest_path(job_dir)) as file:
+        manifest = json.load(file)
+    changed = {key: (manifest.get(key), value) for key, value in expected.items() if manifest.get(key) != value}
+    if changed:
+        raise ValueError(f"Embedding job {job_dir.name} was started with different arguments "
+                         f"(previous, current): {changed}. Use another job_name or delete {job_dir} to start over.")
+    return True
+
+
+def _init_worker(model_loader: Callable, num_threads: Optional[int]) -> None:
+    """
+    Limits the thread pools of a worker process and loads its model copy.
+
+    The limit reaches torch through set_num_threads and OnnxEncoder through OMP_NUM_THREADS, which
+    it reads as its default intra-op thread count since ONNX Runtime ignores the variable itself.
+    """
+    global _worker_model
+    if num_threads is not None:
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(num_threads)
+        try:
+            import torch
+            torch.set_num_threads(num_threads)
+        except ImportError:
+            pass
+    _worker_model = model_loader()
+
+
+def _embed_shard(job_dir: Path, shard: int, texts: List[str], batch_size: int, encode_kwargs: dict) -> int:
+    """
+    Encodes one shard and writes its embeddings followed by its completion marker.
+    """
+    start = time.perf_counter()
+    embeddings = np.asarray(encode_long_texts(_worker_model, texts, batch_size=batch_size, **encode_kwargs),
+                            dtype=np.float32)
+
+    # Replace '-' with zero vectors
+    for i, string in enumerate(texts):
+        if string == '-':
+            embeddings[i] = 0
+
+    # Write to a temporary name first so a crash never leaves a truncated shard behind
+    tmp_path = job_dir / f"shard_{shard:05d}.tmp.npy"
+    np.save(tmp_path, embeddings)
+    tmp_path.replace(_shard_path(job_dir, shard))
+    with open(_marker_path(job_dir, shard), 'w') as file:
+        json.dump({"rows": len(texts), "dim": embeddings.shape[1], "seconds": time.perf_counter() - start}, file)
+    return shard
+
+
+def missing_shards(job_name: str, n_rows: int, shard_size: int) -> List[int]:
+    """
+    Lists the shards of an embedding job that have no completion marker yet.
+
+    Raises a ValueError if the job was started with a different number of rows or shard size.
+
+    Args:
+        job_name (str): Name of the job, used as the shard directory name.
+        n_rows (int): Number of texts in the column.
+        shard_size (int): Number of texts per shard.
+
+    Returns:
+        List[int]: The indices of the missing shards.
+    """
+    job_dir = Path(Paths.EMBEDDINGS_DATA_PATH) / job_name
+    _check_manifest(job_dir, {"n_rows": n_rows, "shard_size": shard_size})
+    n_shards = (n_rows + shard_size - 1) // shard_size
+    return [shard for shard in range(n_shards) if not _marker_path(job_dir, shard).exists()]
+
+
+def run_sharded_embedding_job(
+        col: List[str],
+        job_name: str,
+        model_loader: Callable,
+        shard_size: int = 10000,
+        num_workers: int = 1,
+        threads_per_worker: Optional[int] = None,
+        batch_size: int = 12,
+        rank: int = 0,
+        world_size: int = 1,
+        mode: str = "full",
+        max_tokens: int = 512,
+        pooling: str = "mean",
+        head_tokens: Optional[int] = None,
+        stride: Optional[int] = None) -> List[int]:
+    """
+    Embeds a column in fixed-size shards on several worker processes, resuming from previous runs.
+
+    Each shard is written to `<EMBEDDINGS_DATA_PATH>/<job_name>/shard_XXXXX.npy` and then marked as
+    complete by a `shard_XXXXX.done` file. Shards that already have a marker are skipped, so an
+    interrupted job is resumed by calling this function again with the same arguments. Several
+    machines sharing the output directory can split the work with `rank` and `world_size`.
+
+    The first run writes a `manifest.json` with the shard size, the long text arguments and a hash
+    of `col`; later runs raise a ValueError instead of reusing shards computed from other inputs.
+
+    Args:
+        col (List[str]): A list of strings to generate embeddings for.
+        job_name (str): Name of the job, used as the shard directory name.
+        model_loader (Callable): Picklable callable returning a model, e.g.
+            functools.partial(BGEM3FlagModel, 'BAAI/bge-m3', use_fp16=True). Called once per worker.
+        shard_size (int): Number of texts per shard.
+        num_workers (int): Number of worker processes, each with its own model copy.
+        threads_per_worker (Optional[int]): Intra-op thread limit of each worker, for torch and OnnxEncoder models.
+        batch_size (int): The batch size for the inference.
+        rank (int): Index of this machine among `world_size` machines; it handles shards with index % world_size == rank.
+        world_size (int): Number of machines working on the job.
+        mode (str): Long text handling, one of "full", "truncate", "head_tail" or "chunk" (see src.data_utils.long_text)
+        max_tokens (int): Token budget per text or chunk when mode is not "full"
+        pooling (str): Pooling of chunk embeddings in "chunk" mode, "mean" or "weighted"
+        head_tokens (Optional[int]): Tokens kept from the start in "head_tail" mode, defaults to half of max_tokens
+        stride (Optional[int]): Step between chunk starts in "chunk" mode, defaults to max_tokens (no overlap)
+
+    Returns:
+        List[int]: The shards completed by this call.
+    """
+    job_dir = Path(Paths.EMBEDDINGS_DATA_PATH) / job_name
+    job_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {"n_rows": len(col), "shard_size": shard_size, "mode": mode, "max_tokens": max_tokens,
+                "pooling": pooling, "head_tokens": head_tokens, "stride": stride, "col_sha256": _hash_texts(col)}
+    if not _check_manifest(job_dir, manifest):
+        if any(job_dir.glob("shard_*.done")):
+            raise ValueError(f"Embedding job {job_name} has shards but no manifest, so they cannot be verified. "
+                             f"Delete {job_dir} to start over.")
+        tmp_path = job_dir / "manifest.tmp.json"
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+        tmp_path.replace(_manifest_path(job_dir))
+
+    n_shards = (len(col) + shard_size - 1) // shard_size
+    own_shards = [shard for shard in range(n_shards) if shard % world_size == rank]
+    missing = set(missing_shards(job_name, len(col), shard_size))
+    todo = [shard for shard in own_shards if shard in missing]
+    for shard in own_shards:
+        Metrics.record_cache("embedding_shards", hit=shard not in todo)
+    print(f"Embedding job {job_name}: {len(own_shards) - len(todo)} of {len(own_shards)} shards already done, "
+          f"{len(todo)} to go on {num_workers} workers.")
+
+    encode_kwargs = {"mode": mode, "max_tokens": max_tokens, "pooling": pooling, "head_tokens": head_tokens, "stride": stride}
+    completed, failed = [], []
+    # Spawn rather than fork so that each worker initialises its own torch/ONNX thread pools
+    context = mp.get_context("spawn")
+    with Metrics.timer(f"sharded_embedding.{job_name}", rows=sum(min(shard_size, len(col) - s * shard_size) for s in todo)):
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(model_loader, threads_per_worker)) as executor:
+            futures = {
+                executor.submit(_embed_shard, job_dir, shard, list(col[shard * shard_size:(shard + 1) * shard_size]),
+                                batch_size, encode_kwargs): shard
+                for shard in todo
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    completed.append(future.result())
+                    print(f"Shard {shard} saved successfully ({len(completed)}/{len(todo)}).")
+                except Exception as e:
+                    failed.append(shard)
+                    Metrics.count("errors", stage=f"sharded_embedding.{job_name}")
+                    print(f"An error occurred in shard {shard}: {e}")
+
+    if failed:
+        raise RuntimeError(f"Shards {sorted(failed)} of job {job_name} failed; rerun the job to resume them.")
+    return sorted(completed)
+
+
+def merge_shards(job_name: str, n_rows: int, shard_size: int, file_name: Optional[str] = None) -> np.ndarray:
+    """
+    Merges the shards of a completed embedding job into a single memory-mapped .npy matrix.
+
+    Args:
+        job_name (str): Name of the job, used as the shard directory name.
+        n_rows (int): Number of texts in the column.
+        shard_size (int): Number of texts per shard.
+        file_name (Optional[str]): Name of the merged file. Defaults to "<job_name>.npy".
+
+    Returns:
+        np.ndarray: Read-only memory map of shape (n_rows, dim).
+    """
+    missing = missing_shards(job_name, n_rows, shard_size)
+    if missing:
+        raise RuntimeError(f"Cannot merge job {job_name}, shards {missing} are not complete.")
+
+    job_dir = Path(Paths.EMBEDDINGS_DATA_PATH) / job_name
+    output_path = Path(Paths.EMBEDDINGS_DATA_PATH) / (file_name or f"{job_name}.npy")
+    n_shards = (n_rows + shard_size - 1) // shard_size
+
+    # Check every shard against its marker and its slice before creating the output
+    shards, dim = [], None
+    for shard in range(n_shards):
+        with open(_marker_path(job_dir, shard)) as file:
+            marker = json.load(file)
+        dim = marker["dim"] if dim is None else dim
+        expected = (min(shard_size, n_rows - shard * shard_size), dim)
+        embeddings = np.load(_shard_path(job_dir, shard), mmap_mode='r')
+        if embeddings.shape != expected or (marker["rows"], marker["dim"]) != expected:
+            raise ValueError(f"Shard {_shard_path(job_dir, shard)} has shape {embeddings.shape} and marker "
+                             f"rows={marker['rows']}, dim={marker['dim']}, expected {expected}.")
+        shards.append(embeddings)
+
+    merged = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float32, shape=(n_rows, dim))
+    for shard, embeddings in enumerate(shards):
+        merged[shard * shard_size:(shard + 1) * shard_size] = embeddings
+    merged.flush()
+    del merged
+
+    print(f"Embeddings merged successfully to {output_path}")
+    return np.load(output_path, mmap_mode='r')
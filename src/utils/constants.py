@@ -13,6 +13,8 @@ class Paths:
     INTERIM_DATA_PATH = Path(DATA_PATH, "interim")
     EMBEDDINGS_DATA_PATH = Path(DATA_PATH, "embeddings")
     SUBMISSION_DATA_PATH = Path(DATA_PATH, "submission")
+    METRICS_DATA_PATH = Path(DATA_PATH, "metrics")
+    MODELS_DATA_PATH = Path(DATA_PATH, "models")
 
     INPUT_DATA_PATH = Path(RAW_DATA_PATH, "wi_dataset.csv")
     INPUT_LABELS_PATH = Path(RAW_DATA_PATH, "wi_labels.csv")
@@ -21,6 +23,10 @@ class Paths:
     CLEAN_DATA_PATH = Path(INTERIM_DATA_PATH, "wi_dataset_clean.csv")
     CLEAN_LABELS_PATH = Path(INTERIM_DATA_PATH, "wi_labels_clean.csv")
 
+    METRICS_LOG_PATH = Path(METRICS_DATA_PATH, "pipeline_metrics.jsonl")
+    METRICS_SNAPSHOT_PATH = Path(METRICS_DATA_PATH, "pipeline_metrics.json")
+    METRICS_PROMETHEUS_PATH = Path(METRICS_DATA_PATH, "pipeline_metrics.prom")
+
     SOURCE_PATH = Path(ROOT_PATH, "src")
 
     UTILS_PATH = Path(SOURCE_PATH, "utils")
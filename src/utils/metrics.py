@@ -0,0 +1,322 @@
+import json
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+from src.utils.constants import Paths
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_peak_rss_bytes() -> int:
+    """
+    Returns the peak resident set size of the current process in bytes.
+
+    Returns:
+        int: Peak RSS in bytes, or 0 if it cannot be determined on this platform.
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_current_rss_bytes() -> int:
+    """
+    Returns the current resident set size of the current process in bytes.
+
+    Returns:
+        int: Current RSS in bytes, or 0 if it cannot be determined on this platform (only Linux is supported).
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    """
+    Process-wide registry for pipeline instrumentation.
+
+    The preprocessing and embedding modules report stage timings, row and token
+    counts, peak RSS and cache hits into this registry. The collected values can be
+    written as structured JSON logs or in the Prometheus text exposition format.
+    """
+
+    PREFIX = "classification"
+
+    _lock = threading.Lock()
+    _stage_seconds: Dict[str, float] = defaultdict(float)
+    _stage_calls: Dict[str, int] = defaultdict(int)
+    _stage_rss_delta: Dict[str, int] = {}
+    _stage_peak_rss_increase: Dict[str, int] = {}
+    _counters: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    _cache_hits: Dict[str, int] = defaultdict(int)
+    _cache_misses: Dict[str, int] = defaultdict(int)
+    _log_path: Optional[Path] = None
+
+    @classmethod
+    def configure(cls, log_path: Optional[Union[str, Path]] = Paths.METRICS_LOG_PATH) -> None:
+        """
+        Sets the file that structured JSON log records are appended to.
+
+        Logging is disabled until this is called.
+
+        Args:
+            log_path (Optional[Union[str, Path]]): Path of the JSON lines log file, or None to disable logging.
+                Defaults to Paths.METRICS_LOG_PATH.
+        """
+        cls._log_path = Path(log_path) if log_path is not None else None
+        if cls._log_path is not None:
+            cls._log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Clears all collected metrics.
+        """
+        with cls._lock:
+            cls._stage_seconds.clear()
+            cls._stage_calls.clear()
+            cls._stage_rss_delta.clear()
+            cls._stage_peak_rss_increase.clear()
+            cls._counters.clear()
+            cls._cache_hits.clear()
+            cls._cache_misses.clear()
+
+    @classmethod
+    def log(cls, event: str, **fields) -> None:
+        """
+        Appends a structured JSON record to the configured log file.
+
+        Args:
+            event (str): Name of the event.
+            **fields: Additional JSON-serialisable fields of the record.
+        """
+        if cls._log_path is None:
+            return
+        record = {"ts": time.time(), "event": event, **fields}
+        with cls._lock, open(cls._log_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record, default=str) + "\n")
+
+    @classmethod
+    @contextmanager
+    def timer(cls, stage: str, rows: Optional[int] = None, **fields) -> Iterator[None]:
+        """
+        Times the enclosed block and records it under the given stage.
+
+        Memory is recorded per stage as the change of the current RSS over the block and as the
+        increase of the process peak RSS during the block, i.e. how far the stage pushed the peak
+        beyond all earlier stages. Both keep the largest value over repeated calls.
+
+        Args:
+            stage (str): Name of the stage, e.g. "clean_job_advertisements.description.remove_html_tags".
+            rows (Optional[int]): Number of rows processed by the stage, if known.
+            **fields: Additional fields for the JSON log record, e.g. the batch size.
+        """
+        rss_before, peak_before = get_current_rss_bytes(), get_peak_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            rss_delta = get_current_rss_bytes() - rss_before
+            peak_increase = get_peak_rss_bytes() - peak_before
+            with cls._lock:
+                cls._stage_seconds[stage] += elapsed
+                cls._stage_calls[stage] += 1
+                cls._stage_rss_delta[stage] = max(cls._stage_rss_delta.get(stage, rss_delta), rss_delta)
+                cls._stage_peak_rss_increase[stage] = max(cls._stage_peak_rss_increase.get(stage, 0), peak_increase)
+            if rows is not None:
+                cls.count("rows", rows, stage=stage)
+            cls.log("stage", stage=stage, seconds=elapsed, rows=rows, rss_delta_bytes=rss_delta,
+                    peak_rss_increase_bytes=peak_increase, **fields)
+
+    @classmethod
+    def count(cls, name: str, value: float = 1, stage: str = "") -> None:
+        """
+        Increments a named counter, e.g. "rows" or "tokens", for a stage.
+
+        Args:
+            name (str): Name of the counter.
+            value (float): Amount to add.
+            stage (str): Stage the counter belongs to.
+        """
+        with cls._lock:
+            cls._counters[name][stage] += value
+
+    @classmethod
+    def record_cache(cls, cache: str, hit: bool) -> None:
+        """
+        Records a cache lookup.
+
+        Args:
+            cache (str): Name of the cache.
+            hit (bool): Whether the lookup was a hit.
+        """
+        with cls._lock:
+            if hit:
+                cls._cache_hits[cache] += 1
+            else:
+                cls._cache_misses[cache] += 1
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """
+        Returns the collected metrics as a JSON-serialisable dictionary.
+
+        Returns:
+            dict: Stage timings, counters and cache statistics.
+        """
+        with cls._lock:
+            stages = {
+                stage: {
+                    "seconds": cls._stage_seconds[stage],
+                    "calls": cls._stage_calls[stage],
+                    "rss_delta_bytes": cls._stage_rss_delta.get(stage, 0),
+                    "peak_rss_increase_bytes": cls._stage_peak_rss_increase.get(stage, 0),
+                }
+                for stage in cls._stage_seconds
+            }
+            counters = {name: dict(values) for name, values in cls._counters.items()}
+            caches = {}
+            for cache in set(cls._cache_hits) | set(cls._cache_misses):
+                hits, misses = cls._cache_hits[cache], cls._cache_misses[cache]
+                caches[cache] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                }
+        return {
+            "stages": stages,
+            "counters": counters,
+            "caches": caches,
+            "peak_rss_bytes": get_peak_rss_bytes(),
+        }
+
+    @classmethod
+    def to_prometheus(cls) -> str:
+        """
+        Renders the collected metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics in Prometheus text format.
+        """
+        snapshot = cls.snapshot()
+        p = cls.PREFIX
+        lines = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        family("stage_seconds_total", "counter", "Total wall time spent in a pipeline stage.")
+        for stage, values in snapshot["stages"].items():
+            lines.append(f'{p}_stage_seconds_total{{stage="{_escape_label(stage)}"}} {values["seconds"]}')
+        family("stage_calls_total", "counter", "Number of times a pipeline stage ran.")
+        for stage, values in snapshot["stages"].items():
+            lines.append(f'{p}_stage_calls_total{{stage="{_escape_label(stage)}"}} {values["calls"]}')
+        family("stage_rss_delta_bytes", "gauge", "Largest change of the process RSS over a pipeline stage.")
+        for stage, values in snapshot["stages"].items():
+            lines.append(f'{p}_stage_rss_delta_bytes{{stage="{_escape_label(stage)}"}} {values["rss_delta_bytes"]}')
+        family("stage_peak_rss_increase_bytes", "gauge", "Largest increase of the process peak RSS during a pipeline stage.")
+        for stage, values in snapshot["stages"].items():
+            lines.append(f'{p}_stage_peak_rss_increase_bytes{{stage="{_escape_label(stage)}"}} {values["peak_rss_increase_bytes"]}')
+
+        for name, values in snapshot["counters"].items():
+            family(f"{name}_total", "counter", f"Number of {name} processed per stage.")
+            for stage, value in values.items():
+                lines.append(f'{p}_{name}_total{{stage="{_escape_label(stage)}"}} {value}')
+
+        family("cache_hits_total", "counter", "Number of cache hits.")
+        for cache, values in snapshot["caches"].items():
+            lines.append(f'{p}_cache_hits_total{{cache="{_escape_label(cache)}"}} {values["hits"]}')
+        family("cache_misses_total", "counter", "Number of cache misses.")
+        for cache, values in snapshot["caches"].items():
+            lines.append(f'{p}_cache_misses_total{{cache="{_escape_label(cache)}"}} {values["misses"]}')
+
+        family("peak_rss_bytes", "gauge", "Peak resident set size of the process.")
+        lines.append(f"{p}_peak_rss_bytes {snapshot['peak_rss_bytes']}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def export_json(cls, path: Union[str, Path] = Paths.METRICS_SNAPSHOT_PATH) -> None:
+        """
+        Writes a snapshot of the collected metrics to a JSON file.
+
+        Args:
+            path (Union[str, Path]): Destination file. Defaults to Paths.METRICS_SNAPSHOT_PATH.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(cls.snapshot(), file, indent=2)
+        print("Metrics exported to:", path)
+
+    @classmethod
+    def export_prometheus(cls, path: Union[str, Path] = Paths.METRICS_PROMETHEUS_PATH) -> None:
+        """
+        Writes the collected metrics to a Prometheus text file, e.g. for the node exporter textfile collector.
+
+        The file is written to a temporary name and renamed so scrapers never see a partial file.
+
+        Args:
+            path (Union[str, Path]): Destination file, conventionally ending in ".prom".
+                Defaults to Paths.METRICS_PROMETHEUS_PATH.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(cls.to_prometheus())
+        tmp_path.replace(path)
+        print("Metrics exported to:", path)
+
+    @classmethod
+    def serve_prometheus(cls, port: int = 9108, host: str = "0.0.0.0") -> HTTPServer:
+        """
+        Serves the collected metrics on a /metrics endpoint from a background thread.
+
+        Args:
+            port (int): Port to listen on.
+            host (str): Interface to bind to.
+
+        Returns:
+            HTTPServer: The running server; call shutdown() on it to stop serving.
+        """
+        registry = cls
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
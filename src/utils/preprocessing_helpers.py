@@ -1,6 +1,16 @@
 import re
+import sys
 import html
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from functools import lru_cache
+from typing import Optional
+
+# RE2, used by pyarrow.compute, treats \w, \d and \s as ASCII-only. These classes match
+# Python's Unicode-aware \s and \w (str.isspace, str.isalnum or '_') exactly.
+_ARROW_WHITESPACE = r'\t-\r\x{1c}-\x{1f}\x{85}\pZ'
+_ARROW_WORD = r'\pL\pN_'
 
 
 def convert_html_to_ascii(text: str) -> str:
@@ -114,6 +124,32 @@ def contains_only_punctuations_regex(input_string: str) -> bool:
     return bool(re.match(r'^[^\w]+$', input_string))
 
 
+def replace_only_punctuations(text: str) -> str:
+    """
+    Replaces the input text with "-" if it consists only of punctuations.
+
+    Args:
+        text (str): The text to check.
+
+    Returns:
+        str: "-" if the input text contains only punctuations, the input text otherwise.
+    """
+    return "-" if contains_only_punctuations_regex(text) else text
+
+
+def remove_numbers(text: str) -> str:
+    """
+    Removes all digits from the input text.
+
+    Args:
+        text (str): The text to process.
+
+    Returns:
+        str: Text without digits.
+    """
+    return re.sub(r'\d+', '', text)
+
+
 def extract_included_occupations(included_occupations_string):
     """
     Extracts a list of occupations from the given string.
@@ -176,3 +212,114 @@ def extract_excluded_numbers(excluded_occupations_string):
 
     return [{occupation.strip(): number} for occupation, number in matches]
 
+
+
+def _replace_where(array: pa.Array, mask: pa.Array, func, selected: Optional[pa.Array] = None) -> pa.Array:
+    # Runs a Python function only on the rows selected by a vectorized pre-filter
+    selected = pc.filter(array, mask) if selected is None else selected
+    if len(selected) == 0:
+        return array
+    replacements = pa.array([func(text) for text in selected.to_pylist()], type=array.type)
+    return pc.replace_with_mask(array, mask, replacements)
+
+
+def _collapse_whitespaces_arrow(array: pa.Array) -> pa.Array:
+    array = pc.replace_substring_regex(array, f'^[{_ARROW_WHITESPACE}]+|[{_ARROW_WHITESPACE}]+$', '')
+    return pc.replace_substring_regex(array, f'[{_ARROW_WHITESPACE}]+', ' ')
+
+
+def _convert_html_to_ascii_arrow(array: pa.Array) -> pa.Array:
+    # html.unescape only changes texts containing an entity, i.e. an '&'
+    return _replace_where(array, pc.match_substring(array, '&'), convert_html_to_ascii)
+
+
+def _remove_html_tags_arrow(array: pa.Array) -> pa.Array:
+    array = _collapse_whitespaces_arrow(pc.replace_substring_regex(array, '<[^><]+>', ' '))
+    return pc.if_else(pc.equal(array, ''), '-', array)
+
+
+@lru_cache(maxsize=None)
+def _arrow_char_class(predicate_name: str) -> str:
+    # str.islower/str.isupper also cover Other_Lowercase/Other_Uppercase characters (e.g. 'ª'),
+    # which RE2 has no property for, so the class is built from Python itself
+    ranges, start, prev = [], None, None
+    for code in range(sys.maxunicode + 1):
+        if getattr(chr(code), predicate_name)():
+            if start is None:
+                start = code
+            prev = code
+        elif start is not None:
+            ranges.append(f'\\x{{{start:x}}}-\\x{{{prev:x}}}' if prev > start else f'\\x{{{start:x}}}')
+            start = None
+    return '[' + ''.join(ranges) + ']'
+
+
+def _split_uppercase_after_lowercase_arrow(array: pa.Array) -> pa.Array:
+    pattern = f"({_arrow_char_class('islower')})({_arrow_char_class('isupper')})"
+    return pc.replace_substring_regex(array, pattern, r'\1 \2')
+
+
+def _convert_to_lowercase_arrow(array: pa.Array) -> pa.Array:
+    # 'İ' and the Greek final sigma have context or multi-character lowercase mappings in Python
+    special = pc.match_substring_regex(array, '[\u0130\u03a3]')
+    return _replace_where(pc.utf8_lower(array), special, convert_to_lowercase, pc.filter(array, special))
+
+
+def _remove_repeated_punctuations_arrow(array: pa.Array) -> pa.Array:
+    # RE2 has no backreferences, so only texts with two adjacent punctuations go through Python
+    mask = pc.match_substring_regex(array, f'[^{_ARROW_WORD}{_ARROW_WHITESPACE}]{{2}}')
+    return _replace_where(array, mask, remove_repeated_punctuations)
+
+
+def _replace_only_punctuations_arrow(array: pa.Array) -> pa.Array:
+    return pc.if_else(pc.match_substring_regex(array, f'^[^{_ARROW_WORD}]+$'), '-', array)
+
+
+def _remove_numbers_arrow(array: pa.Array) -> pa.Array:
+    return pc.replace_substring_regex(array, r'\p{Nd}+', '')
+
+
+ARROW_KERNELS = {
+    convert_html_to_ascii: _convert_html_to_ascii_arrow,
+    remove_html_tags: _remove_html_tags_arrow,
+    split_uppercase_after_lowercase: _split_uppercase_after_lowercase_arrow,
+    convert_to_lowercase: _convert_to_lowercase_arrow,
+    remove_whitespaces: _collapse_whitespaces_arrow,
+    remove_repeated_punctuations: _remove_repeated_punctuations_arrow,
+    replace_only_punctuations: _replace_only_punctuations_arrow,
+    remove_numbers: _remove_numbers_arrow,
+}
+
+# Vectorized pandas string methods for the other backends, where one exists
+PANDAS_KERNELS = {
+    remove_numbers: lambda series: series.str.replace(r'\d+', '', regex=True),
+}
+
+
+def apply_cleaning(series: pd.Series, func) -> pd.Series:
+    """
+    Applies a text cleaning function to a column.
+
+    Arrow-backed string columns are cleaned with the vectorized pyarrow.compute kernel of the
+    function, when there is one. Other columns use the vectorized pandas string method of the
+    function, when there is one, and fall back to a per-row Series.apply otherwise.
+
+    Args:
+        series (pd.Series): The column to clean.
+        func: One of the text cleaning functions of this module.
+
+    Returns:
+        pd.Series: The cleaned column.
+    """
+    dtype = series.dtype
+    if (func in ARROW_KERNELS
+            and isinstance(dtype, pd.ArrowDtype)
+            and (pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype))):
+        array = pa.array(series.array)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        array = ARROW_KERNELS[func](array)
+        return pd.Series(pd.arrays.ArrowExtensionArray(array), index=series.index, name=series.name)
+    if func in PANDAS_KERNELS:
+        return PANDAS_KERNELS[func](series)
+    return series.apply(func)